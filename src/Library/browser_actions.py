@@ -0,0 +1,81 @@
+from selenium.common.exceptions import StaleElementReferenceException
+from selenium.webdriver import ActionChains
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+import waits
+from metrics import SELENIUM_SECONDS
+
+# Blocking Selenium operations shared by the service handlers.
+# They are always called from the per-uid session executor, never the event loop.
+
+
+def resolve_by(by: str):
+    match by:
+        case "id":
+            return By.ID
+        case "xpath":
+            return By.XPATH
+    return None
+
+
+def locate(browser, by, selector, condition, timeout, poll, cache=None):
+    if cache is not None:
+        element = cache.get(browser, by, selector)
+        if element is not None:
+            try:
+                return waits.wait_for_cached_element(
+                    browser, element, condition, timeout, poll
+                )
+            except StaleElementReferenceException:
+                cache.discard(by, selector)
+    with SELENIUM_SECONDS.time(operation="find_element"):
+        element = waits.wait_for_element(
+            browser, by, selector, condition, timeout, poll
+        )
+    if cache is not None:
+        cache.put(by, selector, element)
+    return element
+
+
+def find_and_do(
+    browser, by: str, search: str, action: str, text=None, wait=None, cache=None
+):
+    field_search = resolve_by(by)
+    search_element = search.strip('"')
+
+    # Explicit wait that returns as soon as the element is usable for the action
+    condition = waits.ACTION_CONDITIONS.get(action, "presence")
+    timeout, poll = 2.0, 0.05
+    if wait is not None:
+        # Page conditions are waited for first, then the element itself
+        waits.wait_with_options(browser, wait, default=condition)
+        if wait.condition in waits.ELEMENT_CONDITIONS:
+            condition = wait.condition
+        timeout, poll = wait.timeout, wait.poll_ms / 1000
+
+    # Extend for other "By" methods like name, xpath, etc.
+
+    for attempt in range(2):
+        field = locate(
+            browser, field_search, search_element, condition, timeout, poll, cache
+        )
+        try:
+            if action == "click":
+                with SELENIUM_SECONDS.time(operation="click"):
+                    field.click()
+            elif action == "fill":
+                with SELENIUM_SECONDS.time(operation="send_keys"):
+                    for line in text or []:
+                        field.send_keys(line)
+            return field
+        except StaleElementReferenceException:
+            # A cached element went away under us, resolve it once more
+            if cache is None or attempt:
+                raise
+            cache.discard(field_search, search_element)
+
+
+def press_key(browser, button: str):
+    with SELENIUM_SECONDS.time(operation="press_key"):
+        ActionChains(browser).key_down(Keys.RETURN).key_up(Keys.RETURN).perform()
+
@@ -0,0 +1,149 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from selenium.common.exceptions import WebDriverException
+
+
+class BrowserPool:
+    """Keeps pre-launched drivers ready so new sessions skip browser startup."""
+
+    def __init__(
+        self,
+        factory: Callable[[], object],
+        size: int = 2,
+        reset: Optional[Callable[[object], None]] = None,
+        warm_url: Optional[str] = "about:blank",
+        refill_workers: int = 2,
+    ):
+        self._factory = factory
+        self._size = max(size, 0)
+        self._reset = reset
+        self._warm_url = warm_url
+        self._idle: "queue.Queue[object]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._closed = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(refill_workers, 1), thread_name_prefix="browser-pool"
+        )
+        self.hits = 0
+        self.misses = 0
+        self.recycled = 0
+
+    def start(self):
+        self._refill()
+
+    def acquire(self):
+        driver = None
+        while driver is None:
+            try:
+                candidate = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if self._is_alive(candidate):
+                driver = candidate
+            else:
+                self._quit(candidate)
+        self._refill()
+        if driver is not None:
+            self.hits += 1
+            return driver
+        # Pool ran dry, fall back to launching a browser inline.
+        self.misses += 1
+        return self._factory()
+
+    def release(self, driver, recycle: bool = True):
+        if self._closed or not recycle or self._idle.qsize() >= self._size:
+            self._quit(driver)
+            return
+        try:
+            if self._reset is not None:
+                self._reset(driver)
+        except WebDriverException:
+            self._quit(driver)
+            self._refill()
+            return
+        self.recycled += 1
+        self._idle.put(driver)
+
+    def discard(self, driver):
+        self._quit(driver)
+        self._refill()
+
+    def close(self):
+        self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        while True:
+            try:
+                self._quit(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def stats(self):
+        return {
+            "size": self._size,
+            "idle": self._idle.qsize(),
+            "pending": self._pending,
+            "hits": self.hits,
+            "misses": self.misses,
+            "recycled": self.recycled,
+        }
+
+    def _refill(self):
+        with self._lock:
+            if self._closed:
+                return
+            missing = self._size - self._idle.qsize() - self._pending
+            self._pending += max(missing, 0)
+        for _ in range(missing):
+            self._executor.submit(self._spawn)
+
+    def _spawn(self):
+        driver = None
+        try:
+            driver = self._factory()
+            if self._warm_url:
+                driver.get(self._warm_url)
+        except WebDriverException:
+            if driver is not None:
+                self._quit(driver)
+            driver = None
+        finally:
+            with self._lock:
+                self._pending -= 1
+        if driver is None:
+            return
+        if self._closed:
+            self._quit(driver)
+        else:
+            self._idle.put(driver)
+
+    @staticmethod
+    def _is_alive(driver):
+        try:
+            driver.current_window_handle
+            return True
+        except WebDriverException:
+            return False
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+
+def reset_driver(driver):
+    # Drop whatever the previous session left behind before handing it out again
+    for handle in driver.window_handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(driver.window_handles[0])
+    driver.delete_all_cookies()
+    driver.execute_script(
+        "try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}"
+    )
+    driver.get("about:blank")
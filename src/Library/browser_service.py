@@ -1,22 +1,245 @@
+import asyncio
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from typing import Dict, List
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from io import BytesIO
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver import ActionChains
 from pydantic import BaseModel
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import WebDriverException
-from bs4 import BeautifulSoup, Comment
-
-app = FastAPI()
+import browser_actions
+import dom_changes
+import dsl_parser
+import dsl_runner
+import events
+import load_profiles
+import metrics
+import payloads
+import screenshots
+import session_state
+import tab_multiplexer
+import waits
+from readable import ReadableCache
+from browser_pool import BrowserPool, reset_driver
+from element_cache import ElementCache
+from load_profiles import DEFAULT_PROFILE, LoadProfile
+from metrics import PROCESSING_SECONDS, SELENIUM_SECONDS
+from selection_store import SelectionStore
+from session_executor import SessionExecutors
+from session_registry import SessionRegistry
+from session_state import SessionStateStore
+from tab_multiplexer import TabMultiplexer
 
 # Initialize Firefox browser and set it to fullscreen
 firefox_options = webdriver.FirefoxOptions()
 firefox_options.add_argument("--start-fullscreen")
 browsers = {}  # a dictionary holding uid -> selenium.driver instances
-selected_elements: List[Dict[str, str]] = []
+
+
+def start_firefox(options=firefox_options):
+    with SELENIUM_SECONDS.time(operation="start"):
+        return webdriver.Firefox(options=options)
+
+
+# Elements grabbed through the extension, per uid and name, with LRU limits
+selected_elements = SelectionStore(
+    max_items=int(os.environ.get("HUMANWEB_SELECTION_MAX_ITEMS", "200")),
+    max_bytes=int(os.environ.get("HUMANWEB_SELECTION_MAX_BYTES", str(5 * 1024 * 1024))),
+    path=os.environ.get("HUMANWEB_SELECTION_STORE"),
+)
+# Longest element_html kept per selection; descriptors make the rest redundant
+SELECTION_MAX_HTML = int(os.environ.get("HUMANWEB_SELECTION_MAX_HTML", "65536"))
+
+# Pre-launched drivers handed out to new uids, refilled in the background
+browser_pool = BrowserPool(
+    start_firefox,
+    size=int(os.environ.get("HUMANWEB_POOL_SIZE", "2")),
+    reset=reset_driver,
+)
+# Selections, navigations, script steps and errors pushed to SSE subscribers
+event_bus = events.EventBus()
+# Firefox reads load profiles (blocked resources, page load strategy) at launch,
+# so sessions with a non-default profile get drivers from a pool per profile.
+# Pools are kept in LRU order and capped, since every custom profile is a new
+# pool; only the named profiles keep warm drivers.
+profile_pools: "OrderedDict[LoadProfile, BrowserPool]" = OrderedDict()
+profile_pools_lock = threading.Lock()
+browser_profiles: Dict[str, LoadProfile] = {}  # uid -> profile of its driver
+PROFILE_POOL_SIZE = int(os.environ.get("HUMANWEB_PROFILE_POOL_SIZE", "1"))
+MAX_PROFILE_POOLS = int(os.environ.get("HUMANWEB_MAX_PROFILE_POOLS", "4"))
+# With HUMANWEB_TABS_PER_BROWSER > 0, uids become tabs of shared drivers from
+# browser_pool. Tabs share cookies, so a uid with a saved login, a non-default
+# load profile or isolation "process" still gets a driver of its own.
+TABS_PER_BROWSER = int(os.environ.get("HUMANWEB_TABS_PER_BROWSER", "0"))
+tabs = None
+if TABS_PER_BROWSER > 0:
+    # Through the global, so a pool swapped in later (the benchmark) is used
+    tabs = TabMultiplexer(
+        lambda: browser_pool.acquire(),
+        lambda driver, **kwargs: browser_pool.release(driver, **kwargs),
+        lambda driver: browser_pool.discard(driver),
+        TABS_PER_BROWSER,
+    )
+# Blocking Selenium work runs here, serialized per uid and parallel across uids.
+# A tab uid also holds its shared driver for the whole call.
+session_executors = SessionExecutors(
+    guard=tabs.guard if tabs is not None else None, keep=browsers.__contains__
+)
+# Readable content per uid, reused until the page source hash changes
+readable_cache = ReadableCache()
+# Encoded screenshots, reused while the page state hash is unchanged
+screenshot_cache = screenshots.ScreenshotCache()
+element_caches: Dict[str, ElementCache] = {}  # uid -> resolved elements
+ELEMENT_CACHE_SIZE = int(os.environ.get("HUMANWEB_ELEMENT_CACHE_SIZE", "256"))
+# Cookies and web storage per uid, encrypted at rest and put back into fresh
+# drivers so logins survive restarts. Enabled by setting HUMANWEB_STATE_KEY to
+# a Fernet key (Fernet.generate_key()).
+session_states = None
+if os.environ.get("HUMANWEB_STATE_KEY"):
+    session_states = SessionStateStore(
+        os.environ.get("HUMANWEB_STATE_STORE", "session_state.db"),
+        os.environ["HUMANWEB_STATE_KEY"],
+    )
+# Running as one of several workers behind router.py: HUMANWEB_WORKER_URL is
+# the address the router reaches this process on, and the worker heartbeats
+# it with its load into the shared registry
+WORKER_URL = os.environ.get("HUMANWEB_WORKER_URL")
+WORKER_CAPACITY = int(os.environ.get("HUMANWEB_WORKER_CAPACITY", "8"))
+session_registry = None
+if WORKER_URL:
+    session_registry = SessionRegistry(
+        os.environ.get("HUMANWEB_REGISTRY", "registry.db")
+    )
+
+# Session, pool and cache state, read when /metrics is scraped
+metrics.registry.callback_gauge(
+    "humanweb_active_sessions",
+    "Browser sessions bound to a uid.",
+    lambda: len(browsers),
+)
+metrics.registry.callback_gauge(
+    "humanweb_session_executors",
+    "Per-uid executor threads.",
+    lambda: len(session_executors),
+)
+metrics.registry.callback_gauge(
+    "humanweb_pool",
+    "Browser pool counters.",
+    lambda: {(key,): value for key, value in browser_pool.stats().items()},
+    ("stat",),
+)
+if tabs is not None:
+    metrics.registry.callback_gauge(
+        "humanweb_tabs",
+        "Shared browsers and the uids multiplexed onto them as tabs.",
+        lambda: {(key,): value for key, value in tabs.stats().items()},
+        ("stat",),
+    )
+
+
+def cache_stats():
+    stats = {
+        "readable": readable_cache.stats(),
+        "screenshot": screenshot_cache.stats(),
+        "selection": selected_elements.stats(),
+    }
+    elements = {}
+    for cache in list(element_caches.values()):
+        for key, value in cache.stats().items():
+            elements[key] = elements.get(key, 0) + value
+    stats["element"] = elements
+    return {
+        (name, key): value
+        for name, values in stats.items()
+        for key, value in values.items()
+    }
+
+
+metrics.registry.callback_gauge(
+    "humanweb_cache", "Cache entries and counters.", cache_stats, ("cache", "stat")
+)
+
+
+def timed(stage: str, fn, *args):
+    with PROCESSING_SECONDS.time(stage=stage):
+        return fn(*args)
+
+
+def read_source(browser):
+    with SELENIUM_SECONDS.time(operation="page_source"):
+        return browser.page_source
+
+
+async def heartbeat():
+    while True:
+        try:
+            uids = list(browsers)
+            await run_in_threadpool(
+                session_registry.heartbeat, WORKER_URL, len(uids), WORKER_CAPACITY, uids
+            )
+        except sqlite3.OperationalError:
+            # A locked registry file shouldn't take the worker down; retry next beat
+            pass
+        await asyncio.sleep(session_registry.ttl / 3)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    event_bus.bind(asyncio.get_running_loop())
+    browser_pool.start()
+    beat = None
+    if session_registry is not None:
+        beat = asyncio.create_task(heartbeat())
+    yield
+    if beat is not None:
+        beat.cancel()
+        session_registry.deregister(WORKER_URL)
+    for uid in list(browsers):
+        await session_executors.run(uid, save_session_state, uid)
+    session_executors.shutdown()
+    browser_pool.close()
+    for pool in profile_pools.values():
+        pool.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    response = None
+    try:
+        response = await call_next(request)
+        return response
+    finally:
+        # The route template keeps uids out of the label values
+        route = request.scope.get("route")
+        endpoint = route.path if route is not None else "unmatched"
+        status = response.status_code if response is not None else 500
+        metrics.REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            endpoint=endpoint,
+            status=status,
+        )
+        if request.headers.get("content-length"):
+            metrics.REQUEST_BYTES.observe(
+                int(request.headers["content-length"]), endpoint=endpoint
+            )
+        if response is not None and response.headers.get("content-length"):
+            metrics.RESPONSE_BYTES.observe(
+                int(response.headers["content-length"]), endpoint=endpoint
+            )
 
 
 class KeyboardAction(BaseModel):
@@ -24,9 +247,46 @@ class KeyboardAction(BaseModel):
     button: str
 
 
+class WaitOptions(BaseModel):
+    # None picks the default for the action: clickable for click, visibility
+    # for fill, presence otherwise. Page conditions (dom_settled, network_idle,
+    # ready) are waited for before the element is located.
+    condition: str | None = None
+    timeout: float = 2.0
+    settle_ms: int = 500
+    poll_ms: int = 50
+
+
+class WaitDetails(WaitOptions):
+    uid: str
+    By: str | None = None
+    Search: str | None = None
+
+
+class ProfileDetails(BaseModel):
+    # Fields of load_profiles.LoadProfile. With page_load_strategy "none" the
+    # navigation returns right away, so pair it with a wait.
+    page_load_strategy: str = "normal"
+    block: List[str] = []  # image, font, media
+    blocked_urls: List[str] = []
+    reduce_motion: bool = False
+    tracking_protection: bool = False
+
+
 class NavigateDetails(BaseModel):
     url: str
     uid: str
+    source_mode: str = "full"
+    known_hash: str | None = None
+    wait: WaitOptions | None = None
+    # A name from load_profiles.PROFILES or a custom profile; None keeps the
+    # uid's current one. Changing it switches the uid to a new driver, and
+    # the old one is reset: cookies and storage (e.g. a login) only come along
+    # when session state snapshots are on (HUMANWEB_STATE_KEY).
+    profile: str | ProfileDetails | None = None
+    # "tab" in a shared browser or a dedicated "process"; None keeps the uid's
+    # current placement, or lets the service choose for a new uid
+    isolation: str | None = None
 
 
 class ElementActions(BaseModel):
@@ -35,11 +295,52 @@ class ElementActions(BaseModel):
     Action: str
     Text: str
     uid: str
+    Wait: WaitOptions | None = None
+
+
+class ReleaseDetails(BaseModel):
+    uid: str
+    recycle: bool = True
+
+
+class ScriptStep(BaseModel):
+    command: str
+    args: List[str] = []
+    wait: WaitOptions | None = None
+
+
+class ScriptDetails(BaseModel):
+    uid: str
+    script: str | None = None
+    steps: List[ScriptStep] | None = None
+    start_line: int = 0
+    variables: Dict[str, str] = {}
+    stop_on_error: bool = False
+    # Applied to every step that doesn't set its own wait
+    wait: WaitOptions | None = None
+    # Load profile and isolation for NAVIGATE steps, as in NavigateDetails
+    profile: str | ProfileDetails | None = None
+    isolation: str | None = None
+
+
+class ElementDescriptor(BaseModel):
+    # Computed by the extension; xpath is unique in the page it was grabbed on
+    xpath: str
+    css: str | None = None
+    tag: str | None = None
+    attributes: Dict[str, str] = {}
+    bbox: Dict[str, float] | None = None
+    text: str = ""
+    html_length: int | None = None
 
 
 class SelectedElement(BaseModel):
-    element_html: str
+    # The extension sends a descriptor and a capped element_html; either alone
+    # is accepted
+    element_html: str | None = None
     element_name: str | None = None
+    uid: str = "default"
+    descriptor: ElementDescriptor | None = None
 
 
 @app.get("/")
@@ -47,27 +348,52 @@ def read_root():
     return {"Hello": "World"}
 
 
+@app.get("/metrics")
+async def get_metrics():
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.post("/v1/connectors/browser/update_selected_element/")
 async def update_selected_element(element: SelectedElement):
-    global selected_elements
-    selected_elements.append(
-        {"name": element.element_name, "html": element.element_html}
-    )
+    if element.element_html is None and element.descriptor is None:
+        raise HTTPException(
+            status_code=422, detail="Either element_html or descriptor is required"
+        )
+    html = element.element_html
+    stored = {"name": element.element_name, "html": html}
+    if html is not None and len(html) > SELECTION_MAX_HTML:
+        stored["html"] = html[:SELECTION_MAX_HTML]
+        stored["html_truncated"] = True
+    descriptor = element.descriptor
+    if descriptor is not None:
+        stored.update(
+            xpath=descriptor.xpath,
+            css=descriptor.css,
+            tag=descriptor.tag,
+            attributes=descriptor.attributes,
+            bbox=descriptor.bbox,
+            text=descriptor.text,
+            html_length=descriptor.html_length,
+        )
+    selected_elements.add(element.uid, stored)
+    event_bus.publish(element.uid, "selection", stored)
     return {"status": "success"}
 
 
 @app.get("/v1/connectors/browser/get_last_selected_element/")
-async def get_last_selected_element():
-    if selected_elements:
-        return {"element": selected_elements[-1]}
+async def get_last_selected_element(uid: str = "default"):
+    element = selected_elements.last(uid)
+    if element is not None:
+        return {"element": element}
     else:
         raise HTTPException(status_code=404, detail="No element has been selected yet")
 
 
 @app.get("/v1/connectors/browser/get_all_selected_elements/")
-async def get_all_selected_elements():
-    if selected_elements:
-        return {"elements": selected_elements}
+async def get_all_selected_elements(uid: str = "default"):
+    elements = selected_elements.all(uid)
+    if elements:
+        return {"elements": elements}
     else:
         raise HTTPException(
             status_code=404, detail="No elements have been selected yet"
@@ -75,138 +401,658 @@ async def get_all_selected_elements():
 
 
 @app.get("/v1/connectors/browser/get_element_by_name/{element_name}")
-async def get_element_by_name(element_name: str):
-    for element in selected_elements:
-        if element["name"] == element_name:
-            return {"element": element}
+async def get_element_by_name(element_name: str, uid: str = "default"):
+    element = selected_elements.get(uid, element_name)
+    if element is not None:
+        return {"element": element}
     raise HTTPException(
         status_code=404, detail=f"No element found with name: {element_name}"
     )
 
 
 @app.get("/v1/connectors/browser/clear_selected_elements/")
-async def clear_selected_elements():
-    global selected_elements
-    selected_elements = []
+async def clear_selected_elements(uid: str = "default"):
+    selected_elements.clear(uid)
     return {"status": "success"}
 
 
+@app.get("/v1/connectors/browser/selected_elements_stats/")
+async def get_selected_elements_stats():
+    return selected_elements.stats()
+
+
+def get_browser(uid: str):
+    browser = browsers.get(uid)
+    if browser is None:
+        raise HTTPException(
+            status_code=404, detail=f"No browser session for uid: {uid}"
+        )
+    return browser
+
+
+def selection_xpath(uid: str, locator: str) -> str:
+    # "@name" stands for the XPath of an element grabbed under that name, for
+    # this uid or, as the extension doesn't know uids, for "default"
+    if not locator.startswith("@"):
+        return locator
+    name = locator[1:]
+    element = selected_elements.get(uid, name) or selected_elements.get(
+        "default", name
+    )
+    if element is None or not element.get("xpath"):
+        raise HTTPException(
+            status_code=404, detail=f"No selected element with an XPath named: {name}"
+        )
+    return element["xpath"]
+
+
+def session_error(uid: str, e: Exception, status_code: int = 500):
+    event_bus.publish(uid, "error", {"detail": str(e)})
+    return HTTPException(status_code=status_code, detail=str(e))
+
+
+def get_element_cache(uid: str) -> ElementCache:
+    cache = element_caches.get(uid)
+    if cache is None:
+        cache = element_caches[uid] = ElementCache(ELEMENT_CACHE_SIZE)
+    return cache
+
+
+def is_tab(uid: str) -> bool:
+    return tabs is not None and uid in tabs
+
+
+def save_session_state(uid: str):
+    browser = browsers.get(uid)
+    # A tab sees the cookie jar of every uid in its browser, so its snapshot
+    # would carry their logins; uids that log in need isolation "process"
+    if session_states is None or browser is None or is_tab(uid):
+        return None
+    try:
+        snapshot = session_state.capture(browser)
+    except WebDriverException:
+        return None
+    if snapshot is not None:
+        session_states.save(uid, *snapshot)
+    return snapshot
+
+
+def restore_session_state(uid: str, browser, url: str):
+    if session_states is None or is_tab(uid):
+        return
+    origin = session_state.origin_of(url)
+    state = session_states.load(uid).get(origin)
+    if state is None:
+        return
+    try:
+        with SELENIUM_SECONDS.time(operation="restore_state"):
+            session_state.restore(browser, origin, state)
+    except WebDriverException:
+        # A stale snapshot must not stop the navigation itself
+        pass
+
+
+def get_pool(profile: LoadProfile) -> BrowserPool:
+    if profile == DEFAULT_PROFILE:
+        return browser_pool
+    evicted = None
+    with profile_pools_lock:
+        pool = profile_pools.get(profile)
+        if pool is not None:
+            profile_pools.move_to_end(profile)
+            return pool
+        options = webdriver.FirefoxOptions()
+        options.add_argument("--start-fullscreen")
+        load_profiles.configure_firefox(options, profile)
+        named = profile in load_profiles.PROFILES.values()
+        pool = profile_pools[profile] = BrowserPool(
+            functools.partial(start_firefox, options),
+            size=PROFILE_POOL_SIZE if named else 0,
+            reset=reset_driver,
+        )
+        pool.start()
+        if len(profile_pools) > MAX_PROFILE_POOLS:
+            _, evicted = profile_pools.popitem(last=False)
+    if evicted is not None:
+        # Quits its idle drivers; ones still in use are quit on release
+        evicted.close()
+    return pool
+
+
+def wants_tab(uid: str, profile: LoadProfile, isolation: str | None) -> bool:
+    if tabs is None or isolation == "process" or profile != DEFAULT_PROFILE:
+        return False
+    if isolation == "tab":
+        return True
+    # A saved login would leak into every other tab of the shared browser
+    return session_states is None or not session_states.load(uid)
+
+
+def attach_browser(uid: str, profile: LoadProfile, tab: bool):
+    browser = tabs.open(uid) if tab else get_pool(profile).acquire()
+    browsers[uid] = browser
+    browser_profiles[uid] = profile
+    return browser
+
+
+def detach_browser(uid: str, recycle: bool = True, broken: bool = False):
+    browser = browsers.pop(uid, None)
+    profile = browser_profiles.pop(uid, DEFAULT_PROFILE)
+    if browser is None:
+        return
+    if is_tab(uid):
+        tabs.close(uid, recycle=recycle, broken=broken)
+    elif broken:
+        get_pool(profile).discard(browser)
+    else:
+        get_pool(profile).release(browser, recycle=recycle)
+
+
+def visit(uid: str, browser, url: str, fresh: bool):
+    if fresh:
+        restore_session_state(uid, browser, url)
+    with SELENIUM_SECONDS.time(operation="get"):
+        browser.get(url)
+
+
+def open_url(
+    uid: str,
+    url: str,
+    profile: LoadProfile | None = None,
+    isolation: str | None = None,
+):
+    get_element_cache(uid).invalidate()
+    screenshot_cache.invalidate(uid)
+    browser = browsers.get(uid)
+    current = browser_profiles.get(uid, DEFAULT_PROFILE)
+    profile = profile or current
+    if browser is not None:
+        tab = is_tab(uid)
+        if isolation is not None or profile != current:
+            tab = wants_tab(uid, profile, isolation)
+        if profile != current or tab != is_tab(uid):
+            # Launch settings can't change and a tab can't become a process,
+            # so move the uid to another driver, keeping e.g. its login. Plain
+            # navigations don't snapshot; release, script end and
+            # POST session_state do.
+            save_session_state(uid)
+            detach_browser(uid)
+            browser = None
+    else:
+        tab = wants_tab(uid, profile, isolation)
+    fresh = browser is None
+    if fresh:
+        browser = attach_browser(uid, profile, tab)
+    try:
+        visit(uid, browser, url, fresh)
+    except WebDriverException as e:
+        if "invalid session id" not in str(e):
+            raise
+        # Handle invalid session by creating a new browser instance.
+        detach_browser(uid, broken=True)
+        browser = attach_browser(uid, profile, tab)
+        visit(uid, browser, url, True)
+    event_bus.publish(uid, "navigation", {"url": url})
+    return browser
+
+
 @app.post("/v1/connectors/browser/navigate/")
 async def navigate(details: NavigateDetails):
-    browser = None
-    if details.uid in browsers:
-        browser = browsers[details.uid]
-    else:
-        browser = webdriver.Firefox(options=firefox_options)
-        browsers[details.uid] = browser
+    payloads.check_source_mode(details.source_mode)
+    profile = load_profiles.resolve_profile(details.profile)
+    tab_multiplexer.check_isolation(details.isolation)
+
+    def work():
+        browser = open_url(details.uid, details.url, profile, details.isolation)
+        if details.wait is not None:
+            waits.wait_with_options(browser, details.wait)
+        if details.source_mode == "none":
+            return None
+        return read_source(browser)
+
     try:
-        browser.get(details.url)
-        source = browser.page_source
-        return {"source": source}
+        source = await session_executors.run(details.uid, work)
+        return await run_in_threadpool(
+            timed,
+            "encode",
+            payloads.source_response,
+            source,
+            details.source_mode,
+            details.known_hash,
+        )
     except WebDriverException as e:
-        if "invalid session id" in str(e):
-            # Handle invalid session by creating a new browser instance.
-            browser = webdriver.Firefox(options=firefox_options)
-            browser.get(details.url)
-            source = browser.page_source
-            return {"source": source}
-        raise HTTPException(status_code=500, detail=str(e))
+        raise session_error(details.uid, e)
+
+
+@app.post("/v1/connectors/browser/release/")
+async def release_browser(details: ReleaseDetails):
+    def work():
+        save_session_state(details.uid)
+        if details.uid not in browsers:
+            raise HTTPException(
+                status_code=404, detail=f"No browser session for uid: {details.uid}"
+            )
+        detach_browser(details.uid, recycle=details.recycle)
+        element_caches.pop(details.uid, None)
+
+    await session_executors.run(details.uid, work)
+    event_bus.publish(details.uid, "released", {"recycle": details.recycle})
+    readable_cache.invalidate(details.uid)
+    screenshot_cache.invalidate(details.uid)
+    return {"status": "success"}
+
+
+def get_session_states():
+    if session_states is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Session state snapshots are off; set HUMANWEB_STATE_KEY",
+        )
+    return session_states
+
+
+@app.post("/v1/connectors/browser/session_state/{uid}")
+async def save_session_state_now(uid: str):
+    get_session_states()
+
+    def work():
+        get_browser(uid)
+        if is_tab(uid):
+            raise HTTPException(
+                status_code=409,
+                detail="This uid shares a browser's cookies with other tabs; "
+                "navigate with isolation 'process' to keep its own state",
+            )
+        return save_session_state(uid)
+
+    snapshot = await session_executors.run(uid, work)
+    if snapshot is None:
+        raise HTTPException(
+            status_code=409, detail="The current page has no http(s) origin to save"
+        )
+    return {"status": "success", "origin": snapshot[0]}
+
+
+@app.get("/v1/connectors/browser/session_state/{uid}")
+async def get_session_state(uid: str):
+    return {"origins": get_session_states().summary(uid)}
+
+
+@app.delete("/v1/connectors/browser/session_state/{uid}")
+async def delete_session_state(uid: str):
+    get_session_states().delete(uid)
+    return {"status": "success"}
+
+
+@app.get("/v1/connectors/browser/pool/")
+async def get_pool_stats():
+    return browser_pool.stats()
+
+
+@app.get("/v1/connectors/browser/tabs/")
+async def get_tab_stats():
+    if tabs is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Tab multiplexing is off; set HUMANWEB_TABS_PER_BROWSER",
+        )
+    return tabs.stats()
+
+
+@app.get("/v1/connectors/browser/element_cache/{uid}")
+async def get_element_cache_stats(uid: str):
+    if uid not in element_caches:
+        raise HTTPException(
+            status_code=404, detail=f"No element cache for uid: {uid}"
+        )
+    return element_caches[uid].stats()
+
+
+@app.get("/v1/connectors/browser/readable_cache/")
+async def get_readable_cache_stats():
+    return readable_cache.stats()
+
+
+@app.get("/v1/connectors/browser/screenshot_cache/")
+async def get_screenshot_cache_stats():
+    return screenshot_cache.stats()
 
 
 @app.get("/v1/connectors/browser/source/{uid}")
-async def get_page_source(uid: str):
-    browser = None
-    if uid in browsers:
-        browser = browsers[uid]
+async def get_page_source(
+    uid: str,
+    mode: str = "full",
+    known_hash: str | None = None,
+    if_none_match: str | None = Header(default=None),
+):
+    payloads.check_source_mode(mode)
+    # A standard If-None-Match header turns a plain GET into a conditional one
+    known_hash = known_hash or payloads.parse_etag(if_none_match)
+    if known_hash and mode == "full":
+        mode = "if_changed"
+
+    def work():
+        return read_source(get_browser(uid))
+
     try:
-        source = browser.page_source
-        return {"source": source}
+        source = await session_executors.run(uid, work)
+        return await run_in_threadpool(
+            timed, "encode", payloads.source_response, source, mode, known_hash
+        )
     except WebDriverException as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise session_error(uid, e)
 
 
 @app.get("/v1/connectors/browser/screenshot/{uid}")
-async def get_screenshot(uid: str):
-    browser = None
-    if uid in browsers:
-        browser = browsers[uid]
-    try:
+async def get_screenshot(
+    uid: str,
+    format: str = "png",
+    quality: int = 80,
+    scale: float = 1.0,
+    clip: str | None = None,
+    xpath: str | None = None,
+    max_age_ms: float = 5000,
+):
+    clip_box = screenshots.parse_clip(clip)
+    screenshots.check_options(format, quality, scale, clip_box)
+    options = (format, quality, scale, clip_box, xpath)
+
+    def work():
+        browser = get_browser(uid)
+        # Identical consecutive frames are served from the cache
+        with SELENIUM_SECONDS.time(operation="execute_script"):
+            state = browser.execute_script(screenshots.PAGE_STATE_SCRIPT)
+        image = screenshot_cache.get(uid, (state, options), max_age_ms)
+        if image is not None:
+            return state, image, True, None
+        generation = screenshot_cache.generation
         # Take the screenshot and store it in memory
-        screenshot = browser.get_screenshot_as_png()
-        return StreamingResponse(BytesIO(screenshot), media_type="image/png")
+        if xpath:
+            cache = get_element_cache(uid)
+            field = browser_actions.locate(
+                browser, By.XPATH, xpath, "visibility", 2.0, 0.05, cache
+            )
+            with SELENIUM_SECONDS.time(operation="screenshot"):
+                return state, field.screenshot_as_png, False, generation
+        with SELENIUM_SECONDS.time(operation="screenshot"):
+            return state, browser.get_screenshot_as_png(), False, generation
+
+    try:
+        state, screenshot, cached, generation = await session_executors.run(uid, work)
+        if not cached:
+            # Encoding only needs the bytes, so it runs off the session thread
+            screenshot = await run_in_threadpool(
+                timed,
+                "screenshot_encode",
+                screenshots.render,
+                screenshot,
+                format,
+                quality,
+                scale,
+                clip_box,
+            )
+            screenshot_cache.put(uid, (state, options), screenshot, generation)
+        return StreamingResponse(
+            BytesIO(screenshot),
+            media_type=screenshots.MEDIA_TYPES[format],
+            headers={"X-Screenshot-Cache": "hit" if cached else "miss"},
+        )
     except WebDriverException as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise session_error(uid, e)
 
 
 @app.post("/v1/connectors/browser/FindDo/")
 async def find_and_do_action(element_details: ElementActions):
-    browser = None
-    if element_details.uid in browsers:
-        browser = browsers[element_details.uid]
+    def work():
+        search = element_details.Search
+        if element_details.By == "xpath":
+            search = selection_xpath(element_details.uid, search)
+        try:
+            browser_actions.find_and_do(
+                get_browser(element_details.uid),
+                element_details.By,
+                search,
+                element_details.Action,
+                element_details.Text,
+                element_details.Wait,
+                get_element_cache(element_details.uid),
+            )
+        finally:
+            screenshot_cache.invalidate(element_details.uid)
+
+    try:
+        await session_executors.run(element_details.uid, work)
+    except WebDriverException as e:
+        raise session_error(element_details.uid, e)
+
+
+@app.post("/v1/connectors/browser/wait/")
+async def wait_for_condition(details: WaitDetails):
+    if (details.condition or "presence") not in waits.CONDITIONS:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown wait condition: {details.condition}"
+        )
+
+    def work():
+        browser = get_browser(details.uid)
+        by = browser_actions.resolve_by(details.By) if details.By else None
+        started = time.perf_counter()
+        with SELENIUM_SECONDS.time(operation="wait"):
+            waits.wait_with_options(browser, details, by, details.Search)
+        return (time.perf_counter() - started) * 1000
+
     try:
-        field_search = None
-        match element_details.By:
-            case "id":
-                field_search = By.ID
-            case "xpath":
-                field_search = By.XPATH
-
-        search_element = element_details.Search.strip('"')
-
-        browser.implicitly_wait(2)
-        field = browser.find_element(field_search, search_element)
-        browser.implicitly_wait(2)
-
-        # Extend for other "By" methods like name, xpath, etc.
-
-        if element_details.Action == "click":
-            field.click()
-        elif element_details.Action == "fill":
-            for line in element_details.Text:
-                field.send_keys(line)
+        elapsed_ms = await session_executors.run(details.uid, work)
+        return {"status": "success", "elapsed_ms": round(elapsed_ms, 3)}
+    except TimeoutException as e:
+        raise HTTPException(status_code=408, detail=e.msg)
     except WebDriverException as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise session_error(details.uid, e)
 
 
 @app.post("/v1/connectors/browser/KeyboardClick/")
 async def keyboard_click(action: KeyboardAction):
-    browser = None
-    if action.uid in browsers:
-        browser = browsers[action.uid]
-    try:
-        ActionChains(browser).key_down(Keys.RETURN).key_up(Keys.RETURN).perform()
+    def work():
+        try:
+            browser_actions.press_key(get_browser(action.uid), action.button)
+        finally:
+            screenshot_cache.invalidate(action.uid)
 
+    try:
+        await session_executors.run(action.uid, work)
         return {"status": "success", "message": f"Pressed key: {action.button}"}
-
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
 
 @app.get("/v1/connectors/browser/human_source/{uid}")
 async def get_human_readable_content(uid: str):
-    browser = None
-    if uid in browsers:
-        browser = browsers[uid]
-    try:
-
+    def work():
         # Fetch page source
-        page_source = browser.page_source
+        return read_source(get_browser(uid))
 
-        # Parse with BeautifulSoup
-        soup = BeautifulSoup(page_source, "html.parser")
+    try:
+        page_source = await session_executors.run(uid, work)
+        # Parsing does not touch the driver, so it can run on any worker thread
+        readable_content = await run_in_threadpool(
+            readable_cache.get, uid, page_source
+        )
+        return {"source": readable_content}
+    except WebDriverException as e:
+        raise session_error(uid, e)
 
-        # Remove scripts and styles, which are not visible
-        for script in soup(["script", "style", "head"]):
-            script.extract()
 
-        # Also remove comments
-        for comment in soup.find_all(text=lambda text: isinstance(text, Comment)):
-            comment.extract()
+@app.get("/v1/connectors/browser/changes/{uid}")
+async def get_dom_changes(
+    uid: str, cursor: str | None = None, limit: int = Query(500, ge=1)
+):
+    # Call without a cursor to get one, then pass the returned cursor each time
+    def work():
+        with SELENIUM_SECONDS.time(operation="changes"):
+            return dom_changes.read_changes(get_browser(uid), cursor, limit)
 
-        readable_content = str(soup)
-        return {"source": readable_content}
+    try:
+        return await session_executors.run(uid, work)
     except WebDriverException as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise session_error(uid, e)
+
+
+@app.get("/v1/connectors/browser/events/{uid}")
+async def stream_events(
+    request: Request,
+    uid: str,
+    last_event_id: int = Header(default=0),
+    types: str | None = None,
+):
+    """Server-Sent Events for one uid, or every uid with "*".
+
+    types is an optional comma-separated filter, e.g. selection,step.
+    """
+    wanted = set(types.split(",")) if types else None
+    queue = event_bus.subscribe(uid, last_event_id)
+
+    async def stream():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                if wanted is None or event["type"] in wanted:
+                    yield events.format_sse(event)
+        finally:
+            event_bus.unsubscribe(uid, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/v1/connectors/browser/events_stats/")
+async def get_event_stats():
+    return event_bus.stats()
+
+
+# Script commands that can change what is on screen without a DOM mutation
+PAGE_ACTIONS = ("CLICK_XPATH", "TYPE_XPATH", "KEYBOARD_CLICK")
+
+
+def run_script_step(
+    uid: str,
+    step: dsl_runner.Step,
+    variables: Dict[str, str],
+    profile: LoadProfile | None = None,
+    isolation: str | None = None,
+):
+    cache = get_element_cache(uid)
+    if step.command in PAGE_ACTIONS:
+        screenshot_cache.invalidate(uid)
+    match step.command:
+        case "NAVIGATE":
+            browser = open_url(uid, step.args[0], profile, isolation)
+            if step.wait is not None:
+                waits.wait_with_options(browser, step.wait)
+            return f"Navigated to {step.args[0]}"
+        case "CLICK_XPATH":
+            xpath = selection_xpath(uid, step.args[0])
+            browser = get_browser(uid)
+            browser_actions.find_and_do(
+                browser, "xpath", xpath, "click", wait=step.wait, cache=cache
+            )
+            return f"Clicked element at {xpath}"
+        case "TYPE_XPATH":
+            xpath = selection_xpath(uid, step.args[0])
+            text = " ".join(step.args[1:])
+            browser = get_browser(uid)
+            browser_actions.find_and_do(
+                browser, "xpath", xpath, "fill", [text], step.wait, cache
+            )
+            return f"Typed '{text}' into element at {xpath}"
+        case "READ_XPATH":
+            browser = get_browser(uid)
+            xpath = selection_xpath(uid, step.args[0])
+            field = browser_actions.find_and_do(
+                browser, "xpath", xpath, "", wait=step.wait, cache=cache
+            )
+            return field.text
+        case "KEYBOARD_CLICK":
+            browser_actions.press_key(get_browser(uid), step.args[0])
+            return f"Pressed key: {step.args[0]}"
+        case "SAVE_TO_VARIABLE":
+            variable_name, value = step.args[0], step.args[1:]
+            if value and value[0] == "READ_XPATH":
+                browser = get_browser(uid)
+                xpath = selection_xpath(uid, value[1])
+                field = browser_actions.find_and_do(
+                    browser, "xpath", xpath, "", wait=step.wait, cache=cache
+                )
+                variables[variable_name] = field.text
+            else:
+                variables[variable_name] = " ".join(value)
+            return f"Saved value to variable {variable_name}"
+    raise ValueError(f"Unknown command: {step.command}")
+
+
+@app.post("/v1/connectors/browser/run_script/")
+async def run_script(details: ScriptDetails):
+    # Same grammar as the clients: a bad line fails the whole run up front
+    known = tuple(details.variables)
+    try:
+        if details.script is not None:
+            program = dsl_parser.compile_script(details.script, known)
+            step_waits = [details.wait] * len(program.commands)
+        elif details.steps is not None:
+            program = dsl_parser.compile_steps(
+                tuple((step.command, tuple(step.args)) for step in details.steps),
+                known,
+            )
+            step_waits = [step.wait or details.wait for step in details.steps]
+        else:
+            raise HTTPException(
+                status_code=422, detail="Either script or steps is required"
+            )
+    except dsl_parser.DSLSyntaxError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    profile = load_profiles.resolve_profile(details.profile)
+    tab_multiplexer.check_isolation(details.isolation)
+
+    async def run_step(step, variables):
+        return await session_executors.run(
+            details.uid,
+            run_script_step,
+            details.uid,
+            step,
+            variables,
+            profile,
+            details.isolation,
+        )
+
+    async def stream():
+        # One JSON event per line so clients can render progress as it happens
+        async for event in dsl_runner.iter_events(
+            program,
+            step_waits,
+            details.start_line,
+            dict(details.variables),
+            run_step,
+            details.stop_on_error,
+        ):
+            kind = "script_done" if event["status"] == "done" else "step"
+            event_bus.publish(details.uid, kind, event)
+            if event["status"] == "error":
+                event_bus.publish(details.uid, "error", {"detail": event["result"]})
+            yield json.dumps(event) + "\n"
+        # Scripts usually log in or change state worth keeping
+        await session_executors.run(details.uid, save_session_state, details.uid)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
 
 if __name__ == "__main__":
@@ -1,3 +1,5 @@
+import os
+from contextlib import asynccontextmanager
 from typing import Dict, List
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import StreamingResponse
@@ -8,8 +10,9 @@ from selenium.webdriver.common.by import By
 from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.chrome.options import Options
 from bs4 import BeautifulSoup, Comment
-
-app = FastAPI()
+import load_profiles
+from browser_pool import BrowserPool
+from cdp import CDPConnector, CDPError, CDPNavigationError, CDPScriptError
 
 # Initialize Chrome browser and set it to fullscreen
 # chrome_options = webdriver.ChromeOptions()
@@ -20,16 +23,86 @@ app = FastAPI()
 # google-chrome --remote-debugging-port=9222 --user-data-dir="/tmp/selenium_chrome_profile"
 # Define Chrome options
 chrome_options = Options()
-chrome_options.add_experimental_option("debuggerAddress", "localhost:9222")
+DEBUGGER_ADDRESS = os.environ.get("HUMANWEB_DEBUGGER_ADDRESS", "localhost:9222")
+chrome_options.add_experimental_option("debuggerAddress", DEBUGGER_ADDRESS)
 
 # chrome_options.add_argument("--start-fullscreen")
 browsers = {}  # a dictionary holding uid -> selenium.driver instances
 selected_elements: List[Dict[str, str]] = []
 
+# Pre-attached drivers handed out to new uids, refilled in the background.
+# Every driver talks to the same debugging Chrome, so there is no per-driver
+# state to reset when a session is recycled.
+browser_pool = BrowserPool(
+    lambda: webdriver.Chrome(options=chrome_options),
+    size=int(os.environ.get("HUMANWEB_POOL_SIZE", "1")),
+    warm_url=None,
+)
+
+# Hot reads (navigate, source, screenshot, JS) go straight to the page over the
+# DevTools websocket when websocket-client is installed; HUMANWEB_CDP=0 turns
+# it off. Any protocol failure falls back to the WebDriver call.
+cdp_connector = None
+if os.environ.get("HUMANWEB_CDP", "1") != "0":
+    try:
+        cdp_connector = CDPConnector(DEBUGGER_ADDRESS)
+    except CDPError:
+        cdp_connector = None
+
+
+def via_cdp(uid, browser, operation, fallback):
+    if cdp_connector is not None:
+        try:
+            return operation(cdp_connector.session(uid, browser))
+        except CDPError:
+            cdp_connector.forget(uid)
+    return fallback()
+
+
+def cdp_navigate(uid, browser, url, profile=None):
+    # Load profiles only apply on the DevTools path: blocking is set per page
+    # and the page load strategy picks the event that ends the navigation
+    def operation(session):
+        if profile is None:
+            session.navigate(url)
+        else:
+            session.block_urls(
+                load_profiles.blocked_url_patterns(profile), profile.reduce_motion
+            )
+            session.navigate(url, load_profiles.LOAD_EVENTS[profile.page_load_strategy])
+        return session.page_source()
+
+    def fallback():
+        browser.get(url)
+        return browser.page_source
+
+    return via_cdp(uid, browser, operation, fallback)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    browser_pool.start()
+    yield
+    browser_pool.close()
+    if cdp_connector is not None:
+        cdp_connector.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+class ProfileDetails(BaseModel):
+    page_load_strategy: str = "normal"
+    block: List[str] = []  # image, font, media
+    blocked_urls: List[str] = []
+    reduce_motion: bool = False
+    tracking_protection: bool = False
+
 
 class NavigateDetails(BaseModel):
     url: str
     uid: str
+    profile: str | ProfileDetails | None = None
 
 
 class ElementActions(BaseModel):
@@ -40,9 +113,30 @@ class ElementActions(BaseModel):
     uid: str
 
 
+class ReleaseDetails(BaseModel):
+    uid: str
+    recycle: bool = True
+
+
+class ScriptDetails(BaseModel):
+    uid: str
+    script: str
+
+
+class ElementDescriptor(BaseModel):
+    xpath: str
+    css: str | None = None
+    tag: str | None = None
+    attributes: Dict[str, str] = {}
+    bbox: Dict[str, float] | None = None
+    text: str = ""
+    html_length: int | None = None
+
+
 class SelectedElement(BaseModel):
-    element_html: str
+    element_html: str | None = None
     element_name: str | None = None
+    descriptor: ElementDescriptor | None = None
 
 
 @app.get("/")
@@ -53,9 +147,22 @@ def read_root():
 @app.post("/v1/connectors/browser/update_selected_element/")
 async def update_selected_element(element: SelectedElement):
     global selected_elements
-    selected_elements.append(
-        {"name": element.element_name, "html": element.element_html}
-    )
+    if element.element_html is None and element.descriptor is None:
+        raise HTTPException(
+            status_code=422, detail="Either element_html or descriptor is required"
+        )
+    stored = {"name": element.element_name, "html": element.element_html}
+    if element.descriptor is not None:
+        stored.update(
+            xpath=element.descriptor.xpath,
+            css=element.descriptor.css,
+            tag=element.descriptor.tag,
+            attributes=element.descriptor.attributes,
+            bbox=element.descriptor.bbox,
+            text=element.descriptor.text,
+            html_length=element.descriptor.html_length,
+        )
+    selected_elements.append(stored)
     return {"status": "success"}
 
 
@@ -96,26 +203,48 @@ async def clear_selected_elements():
 
 @app.post("/v1/connectors/browser/navigate/")
 async def navigate(details: NavigateDetails):
+    profile = load_profiles.resolve_profile(details.profile)
     browser = None
     ## see if browsers contains the uid
     if details.uid in browsers:
         browser = browsers[details.uid]
     else:
-
-        browser = webdriver.Chrome(options=chrome_options)
+        browser = browser_pool.acquire()
         browsers[details.uid] = browser
     try:
-        browser.get(details.url)
-        source = browser.page_source
+        source = cdp_navigate(details.uid, browser, details.url, profile)
         return {"source": source}
     except WebDriverException as e:
         if "invalid session id" in str(e):
             # Handle invalid session by creating a new browser instance.
-            browser = webdriver.Chrome(options=chrome_options)
-            browser.get(details.url)
-            source = browser.page_source
+            if cdp_connector is not None:
+                cdp_connector.forget(details.uid)
+            browser_pool.discard(browser)
+            browser = browser_pool.acquire()
+            browsers[details.uid] = browser
+            source = cdp_navigate(details.uid, browser, details.url, profile)
             return {"source": source}
         raise HTTPException(status_code=500, detail=str(e))
+    except CDPNavigationError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/v1/connectors/browser/release/")
+async def release_browser(details: ReleaseDetails):
+    browser = browsers.pop(details.uid, None)
+    if browser is None:
+        raise HTTPException(
+            status_code=404, detail=f"No browser session for uid: {details.uid}"
+        )
+    if cdp_connector is not None:
+        cdp_connector.forget(details.uid)
+    browser_pool.release(browser, recycle=details.recycle)
+    return {"status": "success"}
+
+
+@app.get("/v1/connectors/browser/pool/")
+async def get_pool_stats():
+    return browser_pool.stats()
 
 
 @app.get("/v1/connectors/browser/source/{uid}")
@@ -124,7 +253,9 @@ async def get_page_source(uid: str):
     if uid in browsers:
         browser = browsers[uid]
     try:
-        source = browser.page_source
+        source = via_cdp(
+            uid, browser, lambda s: s.page_source(), lambda: browser.page_source
+        )
         return {"source": source}
     except WebDriverException as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -137,12 +268,44 @@ async def get_screenshot(uid: str):
         browser = browsers[uid]
     try:
         # Take the screenshot and store it in memory
-        screenshot = browser.get_screenshot_as_png()
+        screenshot = via_cdp(
+            uid,
+            browser,
+            lambda s: s.screenshot_png(),
+            browser.get_screenshot_as_png,
+        )
         return StreamingResponse(BytesIO(screenshot), media_type="image/png")
     except WebDriverException as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/v1/connectors/browser/evaluate/")
+async def evaluate_script(details: ScriptDetails):
+    browser = browsers.get(details.uid)
+    if browser is None:
+        raise HTTPException(
+            status_code=404, detail=f"No browser session for uid: {details.uid}"
+        )
+    # The expression's value is returned; WebDriver needs an explicit return
+    try:
+        value = via_cdp(
+            details.uid,
+            browser,
+            lambda s: s.evaluate(details.script),
+            lambda: browser.execute_script(f"return ({details.script});"),
+        )
+        return {"value": value}
+    except (WebDriverException, CDPScriptError) as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/v1/connectors/browser/cdp/")
+async def get_cdp_status():
+    if cdp_connector is None:
+        return {"enabled": False, "sessions": 0}
+    return {"enabled": True, "sessions": len(cdp_connector)}
+
+
 @app.post("/v1/connectors/browser/FindDo/")
 async def find_and_do_action(element_details: ElementActions):
     browser = None
@@ -177,7 +340,9 @@ async def get_human_readable_content(uid: str):
     try:
 
         # Fetch page source
-        page_source = browser.page_source
+        page_source = via_cdp(
+            uid, browser, lambda s: s.page_source(), lambda: browser.page_source
+        )
 
         # Parse with BeautifulSoup
         soup = BeautifulSoup(page_source, "html.parser")
@@ -0,0 +1,199 @@
+import base64
+import json
+import threading
+import urllib.request
+from typing import Dict, Optional
+
+try:
+    import websocket  # websocket-client
+except ImportError:  # the fast path is simply unavailable without it
+    websocket = None
+
+
+class CDPError(Exception):
+    pass
+
+
+class CDPScriptError(Exception):
+    """The page's JavaScript threw; not a transport problem, so no fallback."""
+
+
+class CDPNavigationError(Exception):
+    """The page failed to load, where WebDriver's get would have raised."""
+
+
+class CDPSession:
+    """Direct DevTools-protocol connection to one page target.
+
+    Skips the WebDriver HTTP hop for the hot read paths. Calls are serialized
+    with a lock; protocol events are read and dropped by whichever call is
+    waiting, so a call that waits for one has to recognize its own.
+    """
+
+    def __init__(self, ws_url: str, timeout: float = 30.0):
+        try:
+            self._ws = websocket.create_connection(
+                ws_url, timeout=timeout, suppress_origin=True
+            )
+        except Exception as e:
+            raise CDPError(f"Cannot connect to {ws_url}: {e}") from e
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._page_enabled = False
+        self._blocking = ((), False)
+
+    def call(self, method: str, params: Optional[dict] = None, wait_for=None):
+        # wait_for(result) returns a test for the event the call has to wait
+        # for, or None if there is none. Events from before the result count,
+        # so the test has to tell them from ones left over from earlier calls.
+        with self._lock:
+            self._next_id += 1
+            message_id = self._next_id
+            try:
+                request = {"id": message_id, "method": method, "params": params or {}}
+                self._ws.send(json.dumps(request))
+                early = []
+                while True:
+                    message = json.loads(self._ws.recv())
+                    if message.get("id") == message_id:
+                        break
+                    if wait_for is not None and "method" in message:
+                        early.append(message)
+                if "error" in message:
+                    raise CDPError(f"{method}: {message['error'].get('message')}")
+                result = message.get("result", {})
+                expected = wait_for(result) if wait_for is not None else None
+                if expected is not None and not any(map(expected, early)):
+                    while not expected(json.loads(self._ws.recv())):
+                        pass
+            except CDPError:
+                raise
+            except Exception as e:
+                raise CDPError(f"{method} failed: {e}") from e
+            return result
+
+    def evaluate(self, expression: str):
+        result = self.call(
+            "Runtime.evaluate",
+            {"expression": expression, "returnByValue": True, "awaitPromise": True},
+        )
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            exception = details.get("exception", {})
+            raise CDPScriptError(exception.get("description") or details.get("text"))
+        return result["result"].get("value")
+
+    def page_source(self) -> str:
+        return self.evaluate("document.documentElement.outerHTML")
+
+    def screenshot_png(self) -> bytes:
+        result = self.call("Page.captureScreenshot", {"format": "png"})
+        return base64.b64decode(result["data"])
+
+    def navigate(self, url: str, until: Optional[str] = "load"):
+        if not self._page_enabled:
+            self.call("Page.enable")
+            self.call("Page.setLifecycleEventsEnabled", {"enabled": True})
+            self._page_enabled = True
+
+        # By default returns once the page's load lifecycle event fired, like
+        # WebDriver's normal page load; None returns as soon as the navigation
+        # started. Only events of this navigation's loader count. A
+        # fragment-only change stays in the document: no loaderId, no event.
+        # A failed load has errorText and shows Chrome's error page.
+        def wait_for(result):
+            if until is None or "loaderId" not in result or "errorText" in result:
+                return None
+            wanted = {
+                "name": until,
+                "frameId": result.get("frameId"),
+                "loaderId": result["loaderId"],
+            }
+
+            def expected(message):
+                if message.get("method") != "Page.lifecycleEvent":
+                    return False
+                params = message["params"]
+                return all(params.get(key) == value for key, value in wanted.items())
+
+            return expected
+
+        result = self.call("Page.navigate", {"url": url}, wait_for=wait_for)
+        if result.get("errorText"):
+            raise CDPNavigationError(f"{url}: {result['errorText']}")
+
+    def block_urls(self, patterns, reduce_motion: bool = False):
+        if self._blocking == (tuple(patterns), reduce_motion):
+            return
+        # Blocking needs the Network domain, whose events nobody reads; keep
+        # it off unless something is blocked
+        if patterns:
+            self.call("Network.enable")
+            self.call("Network.setBlockedURLs", {"urls": list(patterns)})
+        elif self._blocking[0]:
+            self.call("Network.setBlockedURLs", {"urls": []})
+            self.call("Network.disable")
+        motion = "reduce" if reduce_motion else ""
+        self.call(
+            "Emulation.setEmulatedMedia",
+            {"features": [{"name": "prefers-reduced-motion", "value": motion}]},
+        )
+        self._blocking = (tuple(patterns), reduce_motion)
+
+    def close(self):
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+
+
+class CDPConnector:
+    """Maps uids to DevTools sessions on the page their driver is attached to."""
+
+    def __init__(
+        self, debugger_address: str = "localhost:9222", timeout: float = 30.0
+    ):
+        if websocket is None:
+            raise CDPError("websocket-client is not installed")
+        self.debugger_address = debugger_address
+        self.timeout = timeout
+        self._sessions: Dict[str, CDPSession] = {}
+        self._lock = threading.Lock()
+
+    def _targets(self):
+        url = f"http://{self.debugger_address}/json/list"
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                return json.load(response)
+        except Exception as e:
+            raise CDPError(f"Cannot list DevTools targets: {e}") from e
+
+    def session(self, uid: str, browser) -> CDPSession:
+        with self._lock:
+            session = self._sessions.get(uid)
+        if session is not None:
+            return session
+        # chromedriver window handles are DevTools target ids
+        target_id = browser.current_window_handle
+        for target in self._targets():
+            if target.get("id") == target_id and target.get("webSocketDebuggerUrl"):
+                session = CDPSession(target["webSocketDebuggerUrl"], self.timeout)
+                break
+        else:
+            raise CDPError(f"No DevTools target for window {target_id}")
+        with self._lock:
+            self._sessions[uid] = session
+        return session
+
+    def forget(self, uid: str):
+        with self._lock:
+            session = self._sessions.pop(uid, None)
+        if session is not None:
+            session.close()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def close(self):
+        for uid in list(self._sessions):
+            self.forget(uid)
@@ -0,0 +1,146 @@
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+
+# Installs a MutationObserver once per document that keeps a numbered log of
+# changes, then returns the entries after arguments[0]. Added subtrees are one
+# entry each, not one per descendant. Paths are XPaths, anchored at the
+# nearest element with an id when there is one.
+CHANGES_SCRIPT = """
+var MAX_CHANGES = 5000, MAX_TEXT = 200;
+function xpath(node) {
+    var parts = [];
+    while (node && node.nodeType === 1) {
+        if (node.id && node.id.indexOf('"') < 0) {
+            parts.unshift('//*[@id="' + node.id + '"]');
+            return parts.join("/");
+        }
+        var tag = node.localName, index = 1, count = 0;
+        var sibling = node.parentNode ? node.parentNode.firstElementChild : null;
+        for (; sibling; sibling = sibling.nextElementSibling) {
+            if (sibling.localName !== tag) { continue; }
+            count++;
+            if (sibling === node) { index = count; }
+        }
+        parts.unshift(count > 1 ? tag + "[" + index + "]" : tag);
+        node = node.parentElement;
+    }
+    return "/" + parts.join("/");
+}
+function clip(text) {
+    text = (text || "").replace(/\\s+/g, " ").trim();
+    return text.length > MAX_TEXT ? text.slice(0, MAX_TEXT) + "..." : text;
+}
+function describe(node) {
+    if (node.nodeType === 1) {
+        return {tag: node.localName, text: clip(node.textContent)};
+    }
+    if (node.nodeType === 3 && node.data.trim()) {
+        return {tag: "#text", text: clip(node.data)};
+    }
+    return null;
+}
+if (!window.__humanwebChanges) {
+    var log = window.__humanwebChanges = {
+        doc: Math.random().toString(36).slice(2, 10), seq: 0, entries: []
+    };
+    var push = function (entry) {
+        entry.seq = ++log.seq;
+        log.entries.push(entry);
+        if (log.entries.length > MAX_CHANGES) { log.entries.shift(); }
+    };
+    new MutationObserver(function (records) {
+        records.forEach(function (record) {
+            var target = record.target;
+            if (record.type === "childList") {
+                var parent = xpath(target);
+                record.addedNodes.forEach(function (node) {
+                    var info = describe(node);
+                    if (!info || !node.isConnected) { return; }
+                    info.type = "added";
+                    info.path = node.nodeType === 1 ? xpath(node) : parent;
+                    push(info);
+                });
+                record.removedNodes.forEach(function (node) {
+                    var info = describe(node);
+                    if (!info) { return; }
+                    info.type = "removed";
+                    info.path = parent;
+                    push(info);
+                });
+            } else if (record.type === "attributes") {
+                push({
+                    type: "attribute", path: xpath(target), name: record.attributeName,
+                    value: clip(target.getAttribute(record.attributeName))
+                });
+            } else {
+                push({
+                    type: "text", path: xpath(target.parentElement),
+                    text: clip(target.data)
+                });
+            }
+        });
+    }).observe(document, {
+        subtree: true, childList: true, attributes: true, characterData: true
+    });
+}
+var log = window.__humanwebChanges, after = arguments[0], limit = arguments[1];
+var oldest = log.entries.length ? log.entries[0].seq : log.seq + 1;
+var changes = log.entries.filter(function (entry) { return entry.seq > after; });
+return {
+    doc: log.doc, seq: log.seq, oldest: oldest,
+    truncated: changes.length > limit, changes: changes.slice(0, limit)
+};
+"""
+
+
+def parse_cursor(cursor: Optional[str]) -> Tuple[Optional[str], int]:
+    if not cursor:
+        return None, 0
+    doc, _, seq = cursor.partition(":")
+    try:
+        return doc, int(seq)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Malformed cursor: {cursor}")
+
+
+def coalesce(changes):
+    # Only the latest value of a repeatedly changed attribute or text matters
+    latest = {}
+    for index, change in enumerate(changes):
+        if change["type"] in ("attribute", "text"):
+            latest[(change["type"], change["path"], change.get("name"))] = index
+    return [
+        change
+        for index, change in enumerate(changes)
+        if change["type"] not in ("attribute", "text")
+        or latest[(change["type"], change["path"], change.get("name"))] == index
+    ]
+
+
+def read_changes(browser, cursor: Optional[str], limit: int = 500):
+    """Changes since cursor, plus the cursor to pass next time.
+
+    reset is true when the changes can't be replayed from the cursor: first
+    call, a new document after navigation, or entries that fell out of the
+    page-side log. The client should then take a fresh source snapshot.
+    """
+    doc, after = parse_cursor(cursor)
+    log = browser.execute_script(CHANGES_SCRIPT, after, limit)
+    reset = doc != log["doc"] or after + 1 < log["oldest"]
+    if reset:
+        # The observer was just installed or the log moved on; start from now
+        return {"cursor": f"{log['doc']}:{log['seq']}", "reset": True, "changes": []}
+    changes = log["changes"]
+    last = log["seq"]
+    if log["truncated"]:
+        # Resume right after what was returned, never past unsent changes
+        last = changes[-1]["seq"] if changes else after
+    for change in changes:
+        del change["seq"]
+    return {
+        "cursor": f"{log['doc']}:{last}",
+        "reset": False,
+        "truncated": log["truncated"],
+        "changes": coalesce(changes),
+    }
@@ -0,0 +1,219 @@
+import functools
+import json
+import re
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+# Command name -> parameter names, also used to build the "Add New Command" form
+COMMANDS = {
+    "NAVIGATE": ["URL"],
+    "ASK_USER": ["Prompt"],
+    "CLICK_XPATH": ["XPath"],
+    "TYPE_XPATH": ["XPath", "Text"],
+    "SAVE_TO_VARIABLE": ["Variable Name", "Value"],
+    "READ_XPATH": ["XPath"],
+    "FIND_AND_SAVE": ["URL", "Query", "Variable Name"],
+    "KEYBOARD_CLICK": ["Keyboard Button"],
+}
+# Commands whose last parameter takes the rest of the line
+GREEDY_COMMANDS = {"ASK_USER"}
+VALUE_FUNCTIONS = {"READ_XPATH": 1, "GENERATE_COMMENT": None}
+# $name, or $$ for a literal $
+VARIABLE_REF = re.compile(r"\$(\$|[A-Za-z_][A-Za-z0-9_]*)")
+IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class DSLSyntaxError(ValueError):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("\n".join(f"line {line + 1}: {msg}" for line, msg in errors))
+
+
+@dataclass(frozen=True)
+class Template:
+    """An argument with its $variable references split out at compile time."""
+
+    text: str
+    parts: Tuple[Tuple[bool, str], ...]
+    refs: Tuple[str, ...]
+
+    @classmethod
+    def parse(cls, text):
+        parts = []
+        position = 0
+        for match in VARIABLE_REF.finditer(text):
+            if match.start() > position:
+                parts.append((False, text[position : match.start()]))
+            name = match.group(1)
+            parts.append((False, "$") if name == "$" else (True, name))
+            position = match.end()
+        if position < len(text):
+            parts.append((False, text[position:]))
+        refs = tuple(name for is_ref, name in parts if is_ref)
+        return cls(text, tuple(parts), refs)
+
+    def render(self, variables: Dict[str, object]) -> str:
+        return "".join(
+            str(variables.get(value, f"${value}")) if is_ref else value
+            for is_ref, value in self.parts
+        )
+
+
+@dataclass(frozen=True)
+class Command:
+    line: int
+    name: str
+    args: Tuple[Template, ...]
+
+    def raw_args(self):
+        return [arg.text for arg in self.args]
+
+    def render_args(self, variables):
+        return [arg.render(variables) for arg in self.args]
+
+    def to_line(self):
+        # A script line that parses back into this command
+        return " ".join([self.name, *map(quote, self.raw_args())])
+
+
+@dataclass(frozen=True)
+class Program:
+    commands: Tuple[Command, ...]
+    variables: Tuple[str, ...]
+
+    def as_steps(self):
+        # Batch form accepted by the browser service run_script endpoint
+        return [
+            {"command": command.name, "args": command.raw_args()}
+            for command in self.commands
+        ]
+
+
+def quote(arg):
+    if arg and not any(char.isspace() or char == '"' for char in arg):
+        return arg
+    return json.dumps(arg, ensure_ascii=False)
+
+
+def tokenize(line):
+    tokens = []
+    position = 0
+    while position < len(line):
+        if line[position].isspace():
+            position += 1
+        elif line[position] == '"':
+            # Quoted arguments are JSON strings, which is what the editor writes
+            try:
+                value, position = json.decoder.scanstring(line, position + 1)
+            except ValueError as e:
+                raise ValueError(f"bad quoted argument: {e.args[0]}") from None
+            tokens.append(value)
+        else:
+            end = position
+            while end < len(line) and not line[end].isspace():
+                end += 1
+            tokens.append(line[position:end])
+            position = end
+    return tokens
+
+
+def _parse_save(tokens):
+    if len(tokens) < 2:
+        raise ValueError("SAVE_TO_VARIABLE expects a variable name and a value")
+    if not IDENTIFIER.match(tokens[0]):
+        raise ValueError(f"invalid variable name: {tokens[0]}")
+    function = tokens[1]
+    if function in VALUE_FUNCTIONS:
+        expected = VALUE_FUNCTIONS[function]
+        if expected is not None and len(tokens) - 2 != expected:
+            raise ValueError(f"{function} expects {expected} argument")
+        if expected is None:
+            return [tokens[0], function, " ".join(tokens[2:])]
+        return tokens
+    return [tokens[0], " ".join(tokens[1:])]
+
+
+def parse_line(index, line):
+    return build_command(index, tokenize(line))
+
+
+def build_command(index, tokens):
+    name, tokens = tokens[0].upper(), list(tokens[1:])
+    if name not in COMMANDS:
+        raise ValueError(f"unknown command: {name}")
+    params = COMMANDS[name]
+    if name == "SAVE_TO_VARIABLE":
+        tokens = _parse_save(tokens)
+    elif name in GREEDY_COMMANDS and len(tokens) > len(params):
+        tokens = tokens[: len(params) - 1] + [" ".join(tokens[len(params) - 1 :])]
+    elif len(tokens) != len(params):
+        raise ValueError(
+            f"{name} expects {len(params)} argument(s) ({', '.join(params)}), "
+            f"got {len(tokens)}"
+        )
+    return Command(index, name, tuple(Template.parse(token) for token in tokens))
+
+
+def _defines(command):
+    if command.name == "SAVE_TO_VARIABLE":
+        return command.args[0].text
+    if command.name == "FIND_AND_SAVE":
+        return command.args[2].text
+    return None
+
+
+def _validate(lines, known_variables):
+    commands = []
+    errors = []
+    defined = set(known_variables)
+    for index, parse in lines:
+        try:
+            command = parse()
+        except ValueError as e:
+            errors.append((index, str(e)))
+            continue
+        for arg in command.args:
+            for ref in arg.refs:
+                if ref not in defined:
+                    errors.append(
+                        (
+                            index,
+                            f"variable ${ref} is used before it is set "
+                            "(write $$ for a literal $)",
+                        )
+                    )
+        variable = _defines(command)
+        if variable:
+            defined.add(variable)
+        commands.append(command)
+    if errors:
+        raise DSLSyntaxError(errors)
+    return Program(tuple(commands), tuple(sorted(defined)))
+
+
+@functools.lru_cache(maxsize=64)
+def compile_script(script, known_variables=()):
+    """Parse and validate a whole script before anything runs.
+
+    Raises DSLSyntaxError listing every problem found, so a typo on the last
+    line fails before any browser work on the first.
+    """
+    lines = []
+    for index, line in enumerate(script.strip().split("\n")):
+        line = line.strip()
+        if line:
+            lines.append((index, functools.partial(parse_line, index, line)))
+    return _validate(lines, known_variables)
+
+
+def compile_steps(steps, known_variables=()):
+    """Like compile_script, for steps already split into (command, args).
+
+    This is the form Program.as_steps produces, so a script compiled on one
+    side is checked against the same grammar on the other.
+    """
+    lines = [
+        (index, functools.partial(build_command, index, [command, *args]))
+        for index, (command, args) in enumerate(steps)
+    ]
+    return _validate(lines, known_variables)
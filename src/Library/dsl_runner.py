@@ -0,0 +1,86 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+
+from dsl_parser import Command, Program
+from metrics import DSL_STEP_SECONDS
+
+# Commands the browser service can run next to the driver. Anything else
+# (FIND_AND_SAVE, GENERATE_COMMENT, ...) is handed back to the client.
+SERVER_COMMANDS = {
+    "NAVIGATE",
+    "CLICK_XPATH",
+    "TYPE_XPATH",
+    "READ_XPATH",
+    "KEYBOARD_CLICK",
+    "SAVE_TO_VARIABLE",
+}
+CLIENT_VALUES = {"GENERATE_COMMENT"}
+
+
+@dataclass
+class Step:
+    """A compiled command with its arguments rendered for one run."""
+
+    line: int
+    command: str
+    args: List[str] = field(default_factory=list)
+    wait: Any = None
+
+
+def runs_on_server(command: Command) -> bool:
+    if command.name == "SAVE_TO_VARIABLE":
+        return command.args[1].text not in CLIENT_VALUES
+    return command.name in SERVER_COMMANDS
+
+
+async def iter_events(
+    program: Program,
+    waits: Sequence[Any],
+    start_line: int,
+    variables: Dict[str, str],
+    run_step: Callable[[Step, Dict[str, str]], Awaitable[str]],
+    stop_on_error: bool = False,
+):
+    """Run the program from start_line on, yielding one event per step.
+
+    waits holds each command's wait options. Execution pauses (and the stream
+    ends) at ASK_USER and at steps the client has to run itself; the client
+    resumes with start_line set to the returned next_line.
+    """
+    for command, wait in zip(program.commands, waits):
+        if command.line < start_line:
+            continue
+        event = {"line": command.line, "command": command.name}
+        if command.name == "ASK_USER":
+            event.update(
+                status="waiting_for_user",
+                result=" ".join(command.render_args(variables)),
+                next_line=command.line + 1,
+                variables=variables,
+            )
+            yield event
+            return
+        if not runs_on_server(command):
+            event.update(
+                status="client_step",
+                text=command.to_line(),
+                next_line=command.line + 1,
+                variables=variables,
+            )
+            yield event
+            return
+        # Variables are substituted from the compiled parts, never by text search
+        step = Step(command.line, command.name, command.render_args(variables), wait)
+        started = time.perf_counter()
+        try:
+            event.update(status="ok", result=await run_step(step, variables))
+        except Exception as e:
+            event.update(status="error", result=str(e))
+        elapsed = time.perf_counter() - started
+        event["duration_ms"] = round(elapsed * 1000, 3)
+        DSL_STEP_SECONDS.observe(elapsed, command=step.command, status=event["status"])
+        yield event
+        if event["status"] == "error" and stop_on_error:
+            break
+    yield {"status": "done", "variables": variables}
@@ -0,0 +1,73 @@
+import threading
+from collections import OrderedDict
+
+from selenium.common.exceptions import WebDriverException
+
+
+class ElementCache:
+    """Resolved WebElements for one uid, keyed by (By, selector).
+
+    Entries are dropped when the session navigates or when an element turns
+    out to be stale. With check_url, a hit also costs a current_url round trip
+    and drops everything once the URL changed since the last hit, for pages
+    that change route without replacing the elements.
+    """
+
+    def __init__(self, capacity: int = 256, check_url: bool = False):
+        self.capacity = capacity
+        self.check_url = check_url
+        self._elements = OrderedDict()
+        self._url = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, browser, by, selector):
+        with self._lock:
+            element = self._elements.get((by, selector))
+        if element is not None and self.check_url and not self._same_url(browser):
+            self.invalidate()
+            element = None
+        with self._lock:
+            if element is None:
+                self.misses += 1
+                return None
+            self._elements.move_to_end((by, selector))
+            self.hits += 1
+            return element
+
+    def _same_url(self, browser):
+        try:
+            url = browser.current_url
+        except WebDriverException:
+            url = None
+        same = self._url is None or url == self._url
+        self._url = url
+        return same
+
+    def put(self, by, selector, element):
+        with self._lock:
+            self._elements[(by, selector)] = element
+            self._elements.move_to_end((by, selector))
+            while len(self._elements) > self.capacity:
+                self._elements.popitem(last=False)
+
+    def discard(self, by, selector):
+        with self._lock:
+            self._elements.pop((by, selector), None)
+
+    def invalidate(self):
+        with self._lock:
+            if self._elements:
+                self.invalidations += 1
+            self._elements.clear()
+            self._url = None
+
+    def stats(self):
+        return {
+            "entries": len(self._elements),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
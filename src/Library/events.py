@@ -0,0 +1,102 @@
+import asyncio
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional, Set
+
+# Every subscriber of a uid gets these; "*" subscribers get every uid's
+ALL_UIDS = "*"
+
+
+class EventBus:
+    """Per-uid session events fanned out to Server-Sent Events subscribers.
+
+    publish may be called from any thread, including the session executors;
+    delivery always happens on the event loop. The last few events per uid
+    are kept so a reconnecting client can resume from Last-Event-ID, for the
+    max_sessions uids that published most recently.
+    """
+
+    def __init__(
+        self, history: int = 100, queue_size: int = 1000, max_sessions: int = 500
+    ):
+        self.history = history
+        self.queue_size = queue_size
+        self.max_sessions = max_sessions
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._recent: Dict[str, deque] = OrderedDict()
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self.dropped = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def publish(self, uid: str, kind: str, data: dict):
+        event = {
+            "id": next(self._ids),
+            "uid": uid,
+            "type": kind,
+            "time": time.time(),
+            "data": data,
+        }
+        with self._lock:
+            recent = self._recent.get(uid)
+            if recent is None:
+                recent = self._recent[uid] = deque(maxlen=self.history)
+                # Released uids and ones that only ever got a 404 age out
+                while len(self._recent) > self.max_sessions:
+                    self._recent.popitem(last=False)
+            else:
+                self._recent.move_to_end(uid)
+            recent.append(event)
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._deliver, event)
+
+    def _deliver(self, event):
+        for key in (event["uid"], ALL_UIDS):
+            for queue in self._subscribers.get(key, ()):
+                if queue.full():
+                    # A slow client loses its oldest events, not the service
+                    queue.get_nowait()
+                    self.dropped += 1
+                queue.put_nowait(event)
+
+    def subscribe(self, uid: str, last_event_id: int = 0) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            if uid == ALL_UIDS:
+                recent = [e for events in self._recent.values() for e in events]
+                recent.sort(key=lambda e: e["id"])
+            else:
+                recent = list(self._recent.get(uid, ()))
+        if last_event_id:
+            for event in recent[-self.queue_size :]:
+                if event["id"] > last_event_id:
+                    queue.put_nowait(event)
+        self._subscribers.setdefault(uid, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, uid: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(uid)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[uid]
+
+    def stats(self):
+        return {
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "sessions": len(self._recent),
+            "dropped": self.dropped,
+        }
+
+
+def format_sse(event) -> str:
+    return (
+        f"id: {event['id']}\nevent: {event['type']}\n"
+        f"data: {json.dumps(event)}\n\n"
+    )
@@ -0,0 +1,147 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import HTTPException
+
+PAGE_LOAD_STRATEGIES = ("normal", "eager", "none")
+RESOURCE_TYPES = ("image", "font", "media")
+
+
+@dataclass(frozen=True)
+class LoadProfile:
+    """What a browser session loads. Hashable, so it can key driver pools."""
+
+    page_load_strategy: str = "normal"
+    block: Tuple[str, ...] = ()  # resource types from RESOURCE_TYPES
+    blocked_urls: Tuple[str, ...] = ()  # shell-style patterns, e.g. *doubleclick*
+    reduce_motion: bool = False
+    tracking_protection: bool = False
+
+
+DEFAULT_PROFILE = LoadProfile()
+PROFILES: Dict[str, LoadProfile] = {
+    "full": DEFAULT_PROFILE,
+    # Text, forms and buttons; navigate returns once the DOM is parsed
+    "light": LoadProfile(
+        page_load_strategy="eager",
+        block=RESOURCE_TYPES,
+        reduce_motion=True,
+        tracking_protection=True,
+    ),
+    # Like light, but navigate returns right away; pair it with a wait
+    "text": LoadProfile(
+        page_load_strategy="none",
+        block=RESOURCE_TYPES,
+        reduce_motion=True,
+        tracking_protection=True,
+    ),
+}
+
+
+def check_profile(profile: LoadProfile):
+    if profile.page_load_strategy not in PAGE_LOAD_STRATEGIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown page_load_strategy: {profile.page_load_strategy}. "
+            f"Expected one of {PAGE_LOAD_STRATEGIES}",
+        )
+    unknown = set(profile.block) - set(RESOURCE_TYPES)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown resource types: {sorted(unknown)}. "
+            f"Expected any of {RESOURCE_TYPES}",
+        )
+
+
+def resolve_profile(profile) -> Optional[LoadProfile]:
+    """A profile name, a request model with LoadProfile's fields, or None."""
+    if profile is None:
+        return None
+    if isinstance(profile, str):
+        if profile not in PROFILES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown profile: {profile}. Expected one of {tuple(PROFILES)}",
+            )
+        return PROFILES[profile]
+    resolved = LoadProfile(
+        page_load_strategy=profile.page_load_strategy,
+        block=tuple(sorted(set(profile.block))),
+        blocked_urls=tuple(profile.blocked_urls),
+        reduce_motion=profile.reduce_motion,
+        tracking_protection=profile.tracking_protection,
+    )
+    check_profile(resolved)
+    return resolved
+
+
+# Firefox: everything is a launch-time preference, so each profile gets its
+# own drivers
+
+
+def blocking_pac(patterns) -> str:
+    # Matching requests are sent to a closed local port and fail immediately.
+    # Firefox only passes scheme and host of https URLs to the PAC script.
+    checks = " || ".join(
+        f"shExpMatch(url, {pattern!r}) || shExpMatch(host, {pattern!r})"
+        for pattern in patterns
+    )
+    script = (
+        "function FindProxyForURL(url, host) {"
+        f" if ({checks}) return 'PROXY 127.0.0.1:9'; return 'DIRECT'; }}"
+    )
+    return "data:text/javascript," + quote(script)
+
+
+def firefox_prefs(profile: LoadProfile) -> Dict[str, object]:
+    prefs = {}
+    if "image" in profile.block:
+        prefs["permissions.default.image"] = 2
+    if "font" in profile.block:
+        prefs["gfx.downloadable_fonts.enabled"] = False
+    if "media" in profile.block:
+        prefs["media.autoplay.default"] = 5
+        prefs["media.preload.default"] = 0
+        prefs["media.preload.auto"] = 0
+    if profile.reduce_motion:
+        prefs["ui.prefersReducedMotion"] = 1
+        prefs["image.animation_mode"] = "none"
+        prefs["toolkit.cosmeticAnimations.enabled"] = False
+    if profile.tracking_protection:
+        prefs["privacy.trackingprotection.enabled"] = True
+    if profile.blocked_urls:
+        prefs["network.proxy.type"] = 2
+        prefs["network.proxy.autoconfig_url"] = blocking_pac(profile.blocked_urls)
+    return prefs
+
+
+def configure_firefox(options, profile: LoadProfile):
+    options.page_load_strategy = profile.page_load_strategy
+    for name, value in firefox_prefs(profile).items():
+        options.set_preference(name, value)
+    return options
+
+
+# Chrome: blocking is applied per page over DevTools, so no relaunch is needed
+
+RESOURCE_URL_PATTERNS = {
+    "image": ("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico"),
+    "font": ("woff", "woff2", "ttf", "otf", "eot"),
+    "media": ("mp4", "webm", "m3u8", "m4s", "mp3", "ogg"),
+}
+# DevTools lifecycle event that ends a navigation for each page load strategy
+LOAD_EVENTS = {
+    "normal": "load",
+    "eager": "DOMContentLoaded",
+    "none": None,
+}
+
+
+def blocked_url_patterns(profile: LoadProfile):
+    patterns = list(profile.blocked_urls)
+    for resource_type in profile.block:
+        for extension in RESOURCE_URL_PATTERNS[resource_type]:
+            patterns += [f"*.{extension}", f"*.{extension}?*"]
+    return patterns
@@ -0,0 +1,205 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; Selenium calls range from sub-millisecond cache hits to page loads
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30
+)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels) -> Tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterable[Tuple[str, str, object]]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, _format_labels(self.labelnames, key), value
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class CallbackGauge(Metric):
+    """Gauge read at scrape time, for state other objects already keep.
+
+    The callback returns a number, or a dict of label value tuples to numbers.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, callback: Callable, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def samples(self):
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in values.items():
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (plus +Inf), sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = [
+                (key, list(counts), total)
+                for key, (counts, total) in self._values.items()
+            ]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = (("le", _format_value(bound)),)
+                labels = _format_labels(self.labelnames, key, le)
+                yield f"{self.name}_bucket", labels, cumulative
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def callback_gauge(self, name, documentation, callback, labelnames=()):
+        return self.register(CallbackGauge(name, documentation, callback, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+registry = Registry()
+
+# Shared instruments; the service registers its state gauges next to its globals
+REQUEST_SECONDS = registry.histogram(
+    "humanweb_http_request_seconds",
+    "Time to produce a response, per endpoint.",
+    ("method", "endpoint", "status"),
+)
+REQUEST_BYTES = registry.histogram(
+    "humanweb_http_request_bytes",
+    "Request body sizes, per endpoint.",
+    ("endpoint",),
+    SIZE_BUCKETS,
+)
+RESPONSE_BYTES = registry.histogram(
+    "humanweb_http_response_bytes",
+    "Response body sizes for non-streaming responses, per endpoint.",
+    ("endpoint",),
+    SIZE_BUCKETS,
+)
+SELENIUM_SECONDS = registry.histogram(
+    "humanweb_selenium_seconds",
+    "Time spent in WebDriver calls, per operation.",
+    ("operation",),
+)
+PROCESSING_SECONDS = registry.histogram(
+    "humanweb_processing_seconds",
+    "Time spent on CPU work outside the driver, per stage.",
+    ("stage",),
+)
+DSL_STEP_SECONDS = registry.histogram(
+    "humanweb_dsl_step_seconds",
+    "Time per DSL script step, per command and outcome.",
+    ("command", "status"),
+)
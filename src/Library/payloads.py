@@ -0,0 +1,61 @@
+import gzip
+import hashlib
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# What a caller can ask to get back for a page source:
+#   full        the whole source in JSON (the default, same as before)
+#   none        nothing, the source is not even fetched from the driver
+#   hash        only the content hash
+#   if_changed  the source only when its hash differs from known_hash
+#   gzip / br   the raw source compressed with gzip or brotli
+SOURCE_MODES = ("full", "none", "hash", "if_changed", "gzip", "br")
+
+
+def source_hash(source: str) -> str:
+    return hashlib.blake2b(source.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def check_source_mode(mode: str):
+    if mode not in SOURCE_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown source mode: {mode}. Expected one of {SOURCE_MODES}",
+        )
+    if mode == "br" and brotli is None:
+        raise HTTPException(
+            status_code=400, detail="brotli is not installed on the browser service"
+        )
+
+
+def parse_etag(value: str | None) -> str | None:
+    if not value:
+        return None
+    return value.strip().removeprefix("W/").strip('"')
+
+
+def source_response(source: str | None, mode: str = "full", known_hash=None):
+    if mode == "none" or source is None:
+        return JSONResponse({"status": "success"})
+
+    digest = source_hash(source)
+    headers = {"ETag": f'"{digest}"'}
+    if mode == "hash":
+        return JSONResponse({"hash": digest}, headers=headers)
+    if mode == "if_changed" and digest == known_hash:
+        return Response(status_code=304, headers=headers)
+    if mode in ("gzip", "br"):
+        raw = source.encode("utf-8")
+        if mode == "gzip":
+            body = gzip.compress(raw, compresslevel=5)
+        else:
+            body = brotli.compress(raw, quality=5)
+        headers["Content-Encoding"] = mode
+        return Response(body, media_type="text/html; charset=utf-8", headers=headers)
+    return JSONResponse({"source": source, "hash": digest}, headers=headers)
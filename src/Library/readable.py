@@ -0,0 +1,85 @@
+import threading
+from typing import Dict, Tuple
+
+from bs4 import BeautifulSoup, Comment
+
+from metrics import PROCESSING_SECONDS
+from payloads import source_hash
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # fall back to the pure-Python BeautifulSoup path
+    lxml_html = None
+else:
+    # Sources arrive as str; as UTF-8 bytes they may keep an XML declaration,
+    # and the encoding is fixed rather than guessed from a meta tag
+    UTF8_PARSER = lxml_html.HTMLParser(encoding="utf-8")
+
+HIDDEN_TAGS = ("script", "style", "head")
+
+
+def extract_with_soup(page_source: str) -> str:
+    # Parse with BeautifulSoup
+    soup = BeautifulSoup(page_source, "html.parser")
+
+    # Remove scripts and styles, which are not visible
+    for script in soup(list(HIDDEN_TAGS)):
+        script.extract()
+
+    # Also remove comments
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+
+    return str(soup)
+
+
+def extract_with_lxml(page_source: str) -> str:
+    # One pass of libxml2's C parser, then strip hidden elements and comments
+    # in place while keeping the text that follows them.
+    document = lxml_html.document_fromstring(
+        page_source.encode("utf-8"), parser=UTF8_PARSER
+    )
+    etree.strip_elements(document, etree.Comment, *HIDDEN_TAGS, with_tail=False)
+    return lxml_html.tostring(document, encoding="unicode")
+
+
+def extract(page_source: str) -> str:
+    if lxml_html is None or not page_source.strip():
+        return extract_with_soup(page_source)
+    try:
+        return extract_with_lxml(page_source)
+    except (ValueError, etree.ParserError):
+        # e.g. a document that is nothing but a comment
+        return extract_with_soup(page_source)
+
+
+class ReadableCache:
+    """Latest readable content per uid, reused while the page source is unchanged."""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, uid: str, page_source: str) -> str:
+        digest = source_hash(page_source)
+        with self._lock:
+            entry = self._entries.get(uid)
+        if entry is not None and entry[0] == digest:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        with PROCESSING_SECONDS.time(stage="readable"):
+            content = extract(page_source)
+        with self._lock:
+            self._entries[uid] = (digest, content)
+        return content
+
+    def invalidate(self, uid: str):
+        with self._lock:
+            self._entries.pop(uid, None)
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,295 @@
+"""Session-affinity router in front of several browser-service workers.
+
+Every worker is its own process (and may be on its own host) with its own
+browsers. The router finds the uid a request is about, sends the request to
+the worker that owns it, and streams the answer back. Placement lives in a
+SessionRegistry that the workers heartbeat into.
+
+    python router.py --workers 4
+
+starts four workers on the ports after the router's and routes to them.
+Workers on other hosts join by running browser_service.py with
+HUMANWEB_WORKER_URL set to their own address and HUMANWEB_REGISTRY pointing
+at the shared registry file.
+"""
+
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qs
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from session_registry import NoWorkerAvailable, SessionRegistry
+
+# Absolute, so spawned workers (started in this directory) open the same file
+REGISTRY_PATH = os.path.abspath(os.environ.get("HUMANWEB_REGISTRY", "registry.db"))
+PREFIX = "/v1/connectors/browser/"
+# Endpoints whose path ends in the uid
+UID_IN_PATH = (
+    "session_state",
+    "element_cache",
+    "source",
+    "screenshot",
+    "human_source",
+    "changes",
+    "events",
+)
+# Not about one session: every live worker answers, keyed by its URL
+FAN_OUT = (
+    "pool",
+    "readable_cache",
+    "screenshot_cache",
+    "events_stats",
+    "selected_elements_stats",
+    "tabs",
+)
+# The extension doesn't know uids. Its selections are stored under "default"
+# on every worker, so @name lookups fall back to them wherever a uid lives.
+SELECTIONS = (
+    "update_selected_element",
+    "get_last_selected_element",
+    "get_all_selected_elements",
+    "get_element_by_name",
+    "clear_selected_elements",
+)
+ALL_UIDS = "*"
+# Requests that can leave state for a new uid on the worker they reach: a
+# browser, an event subscription or a selection. Any other request for a uid
+# nobody owns is answered (usually with a 404) by any worker, unplaced.
+PLACING = ("navigate", "run_script", "events", "update_selected_element")
+# Not forwarded: they describe the connection to the router, not the worker's
+HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "host"}
+
+registry = SessionRegistry(REGISTRY_PATH)
+client: httpx.AsyncClient = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global client
+    # No read timeout: scripts and event streams stay open as long as they run
+    client = httpx.AsyncClient(timeout=httpx.Timeout(None, connect=5.0))
+    yield
+    await client.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+def request_uid(path: str, query: str, body: bytes, content_type: str):
+    uid = parse_qs(query).get("uid")
+    if uid:
+        return uid[0]
+    endpoint, _, rest = path[len(PREFIX) :].partition("/")
+    if endpoint in UID_IN_PATH and rest.strip("/"):
+        return rest.strip("/")
+    if body and content_type.startswith("application/json"):
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            payload = None
+        if isinstance(payload, dict) and isinstance(payload.get("uid"), str):
+            return payload["uid"]
+    return None
+
+
+async def send(worker: str, request: Request, body: bytes):
+    headers = [
+        (name, value)
+        for name, value in request.headers.items()
+        if name.lower() not in HOP_HEADERS
+    ]
+    outgoing = client.build_request(
+        request.method,
+        worker + request.url.path,
+        params=request.url.query,
+        headers=headers,
+        content=body,
+    )
+    return await client.send(outgoing, stream=True)
+
+
+async def live_urls():
+    workers = await run_in_threadpool(registry.live_workers)
+    if not workers:
+        raise HTTPException(
+            status_code=503, detail="No live browser-service worker is registered"
+        )
+    return [worker["url"] for worker in workers]
+
+
+async def send_all(request: Request, body: bytes):
+    async def call(worker):
+        try:
+            response = await send(worker, request, body)
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            return worker, e
+        try:
+            await response.aread()
+        finally:
+            await response.aclose()
+        return worker, response
+
+    return await asyncio.gather(*(call(url) for url in await live_urls()))
+
+
+def decoded(response):
+    try:
+        return response.json()
+    except ValueError:
+        return response.text
+
+
+async def fan_out(request: Request, body: bytes):
+    results = {}
+    for worker, response in await send_all(request, body):
+        if isinstance(response, Exception):
+            results[worker] = {"error": f"Worker unreachable: {response}"}
+        else:
+            results[worker] = decoded(response)
+    return {"workers": results}
+
+
+async def broadcast(request: Request, body: bytes):
+    # Same change on every worker; answer with the first worker that took it
+    responses = [r for _, r in await send_all(request, body)]
+    answered = [r for r in responses if not isinstance(r, Exception)]
+    if not answered:
+        raise HTTPException(status_code=502, detail="No worker reachable")
+    response = next((r for r in answered if r.status_code == 200), answered[0])
+    return JSONResponse(decoded(response), status_code=response.status_code)
+
+
+def streamed(response):
+    headers = {
+        name: value
+        for name, value in response.headers.items()
+        if name.lower() not in HOP_HEADERS
+    }
+    return StreamingResponse(
+        response.aiter_raw(),
+        status_code=response.status_code,
+        headers=headers,
+        background=response.aclose,
+    )
+
+
+async def locate(uid: str, places: bool, exclude: str | None = None) -> str:
+    # Almost every request is for a placed uid; only a miss takes the write lock
+    if exclude is None:
+        worker = await run_in_threadpool(registry.owner, uid)
+        if worker is not None:
+            return worker
+    if places:
+        return await run_in_threadpool(registry.place, uid, exclude)
+    workers = [url for url in await live_urls() if url != exclude]
+    if not workers:
+        raise NoWorkerAvailable("No other live browser-service worker")
+    return workers[0]
+
+
+@app.get("/v1/router/workers")
+async def get_workers():
+    return await run_in_threadpool(registry.stats)
+
+
+@app.api_route(PREFIX + "{path:path}", methods=["GET", "POST", "DELETE"])
+async def route(request: Request, path: str):
+    endpoint = path.partition("/")[0]
+    body = await request.body()
+    if endpoint in FAN_OUT:
+        return await fan_out(request, body)
+    uid = request_uid(
+        request.url.path,
+        request.url.query,
+        body,
+        request.headers.get("content-type", ""),
+    )
+    if uid == ALL_UIDS:
+        raise HTTPException(
+            status_code=400,
+            detail="Streams across all uids are per worker; subscribe to each "
+            "worker listed at /v1/router/workers",
+        )
+    if endpoint in SELECTIONS and uid in (None, "default"):
+        if request.method != "GET" or endpoint == "clear_selected_elements":
+            return await broadcast(request, body)
+        # Every worker holds the same "default" selections; any one will do
+        try:
+            return streamed(await send((await live_urls())[0], request, body))
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            raise HTTPException(status_code=502, detail="Worker unreachable")
+    uid = uid or "default"
+    places = endpoint in PLACING
+    try:
+        worker = await locate(uid, places)
+        try:
+            response = await send(worker, request, body)
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            # Nothing reached the worker, so the request is safe to resend. The
+            # uid gets a fresh browser there, with its saved state if enabled.
+            worker = await locate(uid, places, exclude=worker)
+            response = await send(worker, request, body)
+    except NoWorkerAvailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except (httpx.ConnectError, httpx.ConnectTimeout):
+        raise HTTPException(status_code=502, detail=f"Worker unreachable: {worker}")
+
+    if endpoint == "release" and response.status_code == 200:
+        await run_in_threadpool(registry.release, uid)
+    return streamed(response)
+
+
+def spawn_workers(count: int, host: str, first_port: int):
+    import subprocess
+    import sys
+
+    workers = []
+    for port in range(first_port, first_port + count):
+        env = dict(
+            os.environ,
+            HUMANWEB_WORKER_URL=f"http://{host}:{port}",
+            HUMANWEB_REGISTRY=REGISTRY_PATH,
+        )
+        workers.append(
+            subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "uvicorn",
+                    "browser_service:app",
+                    "--host",
+                    host,
+                    "--port",
+                    str(port),
+                ],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                env=env,
+            )
+        )
+    return workers
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8676)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--worker-host", default="127.0.0.1")
+    args = parser.parse_args()
+
+    workers = spawn_workers(args.workers, args.worker_host, args.port + 1)
+    try:
+        uvicorn.run(app, host="0.0.0.0", port=args.port)
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
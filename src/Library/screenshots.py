@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+try:
+    from PIL import Image
+except ImportError:  # only plain full-size PNGs are available without Pillow
+    Image = None
+
+MEDIA_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+
+# Cheap fingerprint of what is on screen: URL, scroll position, viewport and a
+# counter bumped by a MutationObserver, installed on first use.
+PAGE_STATE_SCRIPT = """
+if (!window.__humanwebShot) {
+    window.__humanwebShot = {mutations: 0};
+    new MutationObserver(function (records) {
+        window.__humanwebShot.mutations += records.length;
+    }).observe(document, {
+        subtree: true, childList: true, attributes: true, characterData: true
+    });
+}
+return [location.href, scrollX, scrollY, innerWidth, innerHeight,
+        window.__humanwebShot.mutations].join("|");
+"""
+
+
+def parse_clip(clip: Optional[str]) -> Optional[Tuple[int, int, int, int]]:
+    if not clip:
+        return None
+    try:
+        x, y, width, height = (int(float(part)) for part in clip.split(","))
+    except (ValueError, OverflowError):
+        raise HTTPException(status_code=400, detail="clip must be x,y,width,height")
+    if width <= 0 or height <= 0:
+        raise HTTPException(
+            status_code=400, detail="clip width and height must be > 0"
+        )
+    return x, y, width, height
+
+
+def check_options(fmt: str, quality: int, scale: float, clip):
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown format: {fmt}. Expected one of {tuple(MEDIA_TYPES)}",
+        )
+    if not 1 <= quality <= 100:
+        raise HTTPException(
+            status_code=400, detail="quality must be between 1 and 100"
+        )
+    if not 0 < scale <= 1:
+        raise HTTPException(status_code=400, detail="scale must be in (0, 1]")
+    if Image is None and (fmt != "png" or scale != 1 or clip):
+        raise HTTPException(
+            status_code=400, detail="Pillow is not installed on the browser service"
+        )
+
+
+def render(png: bytes, fmt="png", quality=80, scale=1.0, clip=None) -> bytes:
+    if fmt == "png" and scale == 1 and clip is None:
+        return png
+    image = Image.open(BytesIO(png))
+    if clip is not None:
+        x, y, width, height = clip
+        image = image.crop((x, y, x + width, y + height))
+    if scale != 1:
+        size = (max(int(image.width * scale), 1), max(int(image.height * scale), 1))
+        image = image.resize(size, Image.BILINEAR)
+    if fmt == "jpeg" and image.mode != "RGB":
+        image = image.convert("RGB")
+    out = BytesIO()
+    if fmt == "png":
+        image.save(out, "PNG", optimize=False)
+    else:
+        image.save(out, fmt.upper(), quality=quality)
+    return out.getvalue()
+
+
+class ScreenshotCache:
+    """Last few encoded frames per uid, keyed by page state and options.
+
+    The page state misses changes that aren't DOM mutations, like typed input
+    values or focus, so actions invalidate the uid's frames. A frame taken
+    before the latest invalidate() of any uid is not stored: coarse, but it
+    only costs a later miss.
+    """
+
+    def __init__(self, per_uid: int = 4):
+        self.per_uid = per_uid
+        self._frames: Dict[str, OrderedDict] = {}
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, uid: str, key, max_age_ms: float):
+        with self._lock:
+            frames = self._frames.get(uid)
+            entry = frames.get(key) if frames else None
+            if entry is None or (time.monotonic() - entry[1]) * 1000 > max_age_ms:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def put(self, uid: str, key, image: bytes, generation: int):
+        with self._lock:
+            if generation != self.generation:
+                return
+            frames = self._frames.setdefault(uid, OrderedDict())
+            frames[key] = (image, time.monotonic())
+            frames.move_to_end(key)
+            while len(frames) > self.per_uid:
+                frames.popitem(last=False)
+
+    def invalidate(self, uid: str):
+        with self._lock:
+            self._frames.pop(uid, None)
+            self.generation += 1
+
+    def stats(self):
+        return {"sessions": len(self._frames), "hits": self.hits, "misses": self.misses}
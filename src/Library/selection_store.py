@@ -0,0 +1,178 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def element_size(element: Dict) -> int:
+    size = 0
+    for value in element.values():
+        if isinstance(value, str):
+            size += len(value)
+        elif isinstance(value, dict):
+            # Descriptor attributes
+            size += sum(len(str(k)) + len(str(v)) for k, v in value.items())
+    return size
+
+
+class SelectionStore:
+    """Elements grabbed through the extension, kept per uid and name.
+
+    Each uid holds at most max_items elements and max_bytes of element data;
+    the least recently used ones are evicted first. With a path the store is
+    persisted, to SQLite by default or to a JSON file when the path ends in
+    .json, and reloaded on start.
+    """
+
+    def __init__(
+        self,
+        max_items: int = 200,
+        max_bytes: int = 5 * 1024 * 1024,
+        path: Optional[str] = None,
+    ):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.path = path
+        self._sessions: Dict[str, OrderedDict] = {}
+        self._bytes: Dict[str, int] = {}
+        self._last: Dict[str, str] = {}
+        self._unnamed = 0
+        self._lock = threading.RLock()
+        self._db = None
+        self.evictions = 0
+        if path and not path.endswith(".json"):
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS selected_elements ("
+                "uid TEXT, key TEXT, element TEXT, PRIMARY KEY (uid, key))"
+            )
+            self._db.commit()
+        self._load()
+
+    def add(self, uid: str, element: Dict):
+        with self._lock:
+            key = element.get("name")
+            if key is None:
+                # Unnamed grabs can't be looked up by name, only as last/all
+                self._unnamed += 1
+                key = f"\0unnamed-{self._unnamed}"
+            elements = self._sessions.setdefault(uid, OrderedDict())
+            self._drop(uid, key)
+            elements[key] = element
+            self._bytes[uid] = self._bytes.get(uid, 0) + element_size(element)
+            self._last[uid] = key
+            evicted = self._evict(uid)
+            self._persist_add(uid, key, element, evicted)
+
+    def last(self, uid: str) -> Optional[Dict]:
+        with self._lock:
+            key = self._last.get(uid)
+            if key is None:
+                return None
+            return self._sessions[uid].get(key)
+
+    def all(self, uid: str):
+        # Least recently used first
+        with self._lock:
+            return list(self._sessions.get(uid, {}).values())
+
+    def get(self, uid: str, name: str) -> Optional[Dict]:
+        with self._lock:
+            elements = self._sessions.get(uid)
+            if not elements or name not in elements:
+                return None
+            elements.move_to_end(name)
+            return elements[name]
+
+    def clear(self, uid: str):
+        with self._lock:
+            self._sessions.pop(uid, None)
+            self._bytes.pop(uid, None)
+            self._last.pop(uid, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM selected_elements WHERE uid = ?", (uid,))
+                self._db.commit()
+            elif self.path:
+                self._write_json()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "elements": sum(len(e) for e in self._sessions.values()),
+                "bytes": sum(self._bytes.values()),
+                "evictions": self.evictions,
+            }
+
+    def _drop(self, uid, key):
+        element = self._sessions.get(uid, {}).pop(key, None)
+        if element is not None:
+            self._bytes[uid] -= element_size(element)
+        return element
+
+    def _evict(self, uid):
+        elements = self._sessions[uid]
+        evicted = []
+        # Always keep the newest element, even if it alone is over the limit
+        while len(elements) > 1 and (
+            len(elements) > self.max_items or self._bytes[uid] > self.max_bytes
+        ):
+            key = next(iter(elements))
+            self._drop(uid, key)
+            evicted.append(key)
+            self.evictions += 1
+            if self._last.get(uid) == key:
+                self._last.pop(uid)
+        return evicted
+
+    def _persist_add(self, uid, key, element, evicted):
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO selected_elements VALUES (?, ?, ?)",
+                (uid, key, json.dumps(element)),
+            )
+            self._db.executemany(
+                "DELETE FROM selected_elements WHERE uid = ? AND key = ?",
+                [(uid, k) for k in evicted],
+            )
+            self._db.commit()
+        elif self.path:
+            self._write_json()
+
+    def _write_json(self):
+        snapshot = {
+            uid: [[key, element] for key, element in elements.items()]
+            for uid, elements in self._sessions.items()
+        }
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"sessions": snapshot, "last": self._last}, f)
+        os.replace(temporary, self.path)
+
+    def _load(self):
+        rows = []
+        if self._db is not None:
+            rows = [
+                (uid, key, json.loads(element))
+                for uid, key, element in self._db.execute(
+                    "SELECT uid, key, element FROM selected_elements ORDER BY rowid"
+                )
+            ]
+        elif self.path and os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            rows = [
+                (uid, key, element)
+                for uid, elements in data["sessions"].items()
+                for key, element in elements
+            ]
+            self._last.update(data.get("last", {}))
+        for uid, key, element in rows:
+            self._sessions.setdefault(uid, OrderedDict())[key] = element
+            self._bytes[uid] = self._bytes.get(uid, 0) + element_size(element)
+            if self._db is not None:
+                self._last[uid] = key
+            if key.startswith("\0unnamed-"):
+                self._unnamed = max(self._unnamed, int(key.rsplit("-", 1)[1]))
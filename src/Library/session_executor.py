@@ -0,0 +1,70 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, ContextManager, Dict, Optional
+
+
+class SessionExecutors:
+    """One single-threaded executor per uid.
+
+    Calls for the same uid run one after another so a driver is never used
+    concurrently, while different uids run in parallel off the event loop.
+    guard(uid), when given, is entered around every call on the executor
+    thread, e.g. to hold a driver shared with other uids. A uid's executor is
+    dropped once no call is queued or running and keep(uid) is false, e.g.
+    because the uid has no browser (anymore).
+    """
+
+    def __init__(
+        self,
+        guard: Optional[Callable[[str], ContextManager]] = None,
+        keep: Optional[Callable[[str], bool]] = None,
+    ):
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._pending: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._guard = guard
+        self._keep = keep
+
+    async def run(self, uid: str, fn, *args, **kwargs):
+        call = functools.partial(fn, *args, **kwargs)
+        if self._guard is not None:
+            call = functools.partial(self._guarded, uid, call)
+        with self._lock:
+            executor = self._executors.get(uid)
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix=f"session-{uid}"
+                )
+                self._executors[uid] = executor
+            self._pending[uid] = self._pending.get(uid, 0) + 1
+            future = executor.submit(call)
+        # Counted down when the call is really over: a cancelled request's
+        # call may still be running on the thread
+        future.add_done_callback(lambda _: self._finished(uid))
+        return await asyncio.wrap_future(future)
+
+    def _guarded(self, uid: str, call):
+        with self._guard(uid):
+            return call()
+
+    def _finished(self, uid: str):
+        with self._lock:
+            self._pending[uid] -= 1
+            if self._pending[uid] or self._keep is None or self._keep(uid):
+                return
+            del self._pending[uid]
+            executor = self._executors.pop(uid)
+        executor.shutdown(wait=False)
+
+    def shutdown(self):
+        with self._lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+            self._pending.clear()
+        for executor in executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def __len__(self):
+        return len(self._executors)
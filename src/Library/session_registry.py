@@ -0,0 +1,160 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+class NoWorkerAvailable(LookupError):
+    pass
+
+
+class SessionRegistry:
+    """Which browser-service worker owns each uid, shared through SQLite.
+
+    Workers heartbeat their URL and capacity; the router places a new uid on
+    the least-loaded live worker and moves it when its owner stops
+    heartbeating. A local file is enough for workers on one host; several
+    hosts need the file on shared storage.
+    """
+
+    def __init__(self, path: str, ttl: float = 15.0):
+        self.ttl = ttl
+        # Autocommit; writes that read first take the lock with BEGIN IMMEDIATE
+        self._db = sqlite3.connect(
+            path, timeout=10, isolation_level=None, check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS workers ("
+            "url TEXT PRIMARY KEY, capacity INTEGER, sessions INTEGER, seen REAL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS placements ("
+            "uid TEXT PRIMARY KEY, worker TEXT, placed REAL)"
+        )
+        self._lock = threading.Lock()
+        self.failovers = 0
+
+    def heartbeat(
+        self, url: str, sessions: int, capacity: int, uids: Optional[List[str]] = None
+    ):
+        """Record a worker as live with its load.
+
+        With uids, the worker's placements for any other uid are dropped once
+        they are older than ttl: the uid was released there, or its first
+        request never got a browser. Younger ones may still be starting one.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO workers VALUES (?, ?, ?, ?)",
+                    (url, capacity, sessions, now),
+                )
+                if uids is not None:
+                    self._db.execute(
+                        "DELETE FROM placements WHERE worker = ? AND placed < ? "
+                        "AND uid NOT IN (SELECT value FROM json_each(?))",
+                        (url, now - self.ttl, json.dumps(list(uids))),
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def deregister(self, url: str):
+        # Its uids are placed again on their next request
+        with self._lock:
+            self._db.execute("DELETE FROM workers WHERE url = ?", (url,))
+            self._db.execute("DELETE FROM placements WHERE worker = ?", (url,))
+
+    def live_workers(self) -> List[Dict]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT w.url, w.capacity, w.sessions, w.seen, COUNT(p.uid) "
+                "FROM workers w LEFT JOIN placements p ON p.worker = w.url "
+                "WHERE w.seen > ? GROUP BY w.url",
+                (time.time() - self.ttl,),
+            ).fetchall()
+        return [
+            {
+                "url": url,
+                "capacity": capacity,
+                "sessions": sessions,
+                "placed": placed,
+                "seen": seen,
+            }
+            for url, capacity, sessions, seen, placed in rows
+        ]
+
+    def owner(self, uid: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT p.worker FROM placements p JOIN workers w ON w.url = p.worker "
+                "WHERE p.uid = ? AND w.seen > ?",
+                (uid, time.time() - self.ttl),
+            ).fetchone()
+        return row[0] if row else None
+
+    def place(self, uid: str, exclude: Optional[str] = None) -> str:
+        """The live owner of uid, placing it on the least-loaded worker first.
+
+        A uid whose owner is gone, or is exclude, moves to another worker.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT p.worker FROM placements p "
+                    "JOIN workers w ON w.url = p.worker "
+                    "WHERE p.uid = ? AND w.seen > ?",
+                    (uid, now - self.ttl),
+                ).fetchone()
+                if row is not None and row[0] != exclude:
+                    self._db.execute("COMMIT")
+                    return row[0]
+                moved = self._db.execute(
+                    "SELECT 1 FROM placements WHERE uid = ?", (uid,)
+                ).fetchone()
+                # Load is the last heartbeat's count plus the uids placed since,
+                # which it couldn't include yet
+                candidates = self._db.execute(
+                    "SELECT w.url, w.capacity, "
+                    "w.sessions + (SELECT COUNT(*) FROM placements p "
+                    "WHERE p.worker = w.url AND p.placed > w.seen) "
+                    "FROM workers w WHERE w.seen > ? AND w.url IS NOT ?",
+                    (now - self.ttl, exclude),
+                ).fetchall()
+                free = [c for c in candidates if c[2] < c[1]]
+                if not free:
+                    raise NoWorkerAvailable(
+                        "No live browser-service worker has a free session slot"
+                    )
+                url = min(free, key=lambda c: c[2] / c[1])[0]
+                self._db.execute(
+                    "INSERT OR REPLACE INTO placements VALUES (?, ?, ?)",
+                    (uid, url, now),
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        if moved:
+            self.failovers += 1
+        return url
+
+    def release(self, uid: str):
+        with self._lock:
+            self._db.execute("DELETE FROM placements WHERE uid = ?", (uid,))
+
+    def stats(self):
+        with self._lock:
+            placed = self._db.execute("SELECT COUNT(*) FROM placements").fetchone()
+        return {
+            "workers": self.live_workers(),
+            "placements": placed[0],
+            "failovers": self.failovers,
+        }
@@ -0,0 +1,152 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import WebDriverException
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:  # session state can't be stored without encryption
+    Fernet = None
+
+COOKIE_FIELDS = (
+    "name",
+    "value",
+    "path",
+    "domain",
+    "secure",
+    "httpOnly",
+    "expiry",
+    "sameSite",
+)
+
+STORAGE_SCRIPT = """
+function dump(storage) {
+    var items = {};
+    for (var i = 0; i < storage.length; i++) {
+        var key = storage.key(i);
+        items[key] = storage.getItem(key);
+    }
+    return items;
+}
+try {
+    return {local: dump(localStorage), session: dump(sessionStorage)};
+} catch (e) {
+    return {local: {}, session: {}};
+}
+"""
+
+RESTORE_SCRIPT = """
+var state = arguments[0];
+try {
+    for (var key in state.local) { localStorage.setItem(key, state.local[key]); }
+    for (var key in state.session) { sessionStorage.setItem(key, state.session[key]); }
+} catch (e) {}
+"""
+
+
+def origin_of(url: str) -> Optional[str]:
+    parts = urlsplit(url or "")
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return None
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def capture(browser):
+    """Cookies and web storage of the page the driver is on, by origin."""
+    origin = origin_of(browser.current_url)
+    if origin is None:
+        return None
+    storage = browser.execute_script(STORAGE_SCRIPT) or {}
+    cookies = [
+        {field: cookie[field] for field in COOKIE_FIELDS if field in cookie}
+        for cookie in browser.get_cookies()
+    ]
+    state = {
+        "cookies": cookies,
+        "local": storage.get("local", {}),
+        "session": storage.get("session", {}),
+        "saved_at": time.time(),
+    }
+    return origin, state
+
+
+def restore(browser, origin: str, state: Dict):
+    # Cookies can only be set for the document's own domain, so land on a
+    # cheap URL of the origin first; the caller navigates to the real page next
+    browser.get(f"{origin}/favicon.ico")
+    now = time.time()
+    for cookie in state["cookies"]:
+        if cookie.get("expiry", now + 1) <= now:
+            continue
+        try:
+            browser.add_cookie(cookie)
+        except WebDriverException:
+            # One rejected cookie must not cost the rest of the login
+            continue
+    browser.execute_script(RESTORE_SCRIPT, state)
+
+
+class SessionStateStore:
+    """Per-uid, per-origin browser state, encrypted with Fernet in SQLite."""
+
+    def __init__(self, path: str, key: str):
+        if Fernet is None:
+            raise RuntimeError("Session state snapshots require cryptography")
+        self._fernet = Fernet(key)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS session_state (uid TEXT PRIMARY KEY, data BLOB)"
+        )
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._snapshots: Dict[str, Dict] = {}
+
+    def load(self, uid: str) -> Dict:
+        with self._lock:
+            snapshot = self._snapshots.get(uid)
+            if snapshot is None:
+                row = self._db.execute(
+                    "SELECT data FROM session_state WHERE uid = ?", (uid,)
+                ).fetchone()
+                snapshot = {}
+                if row is not None:
+                    try:
+                        snapshot = json.loads(self._fernet.decrypt(row[0]))
+                    except InvalidToken:
+                        # Written with another key; start over rather than fail
+                        snapshot = {}
+                self._snapshots[uid] = snapshot
+            return snapshot
+
+    def save(self, uid: str, origin: str, state: Dict):
+        snapshot = dict(self.load(uid))
+        snapshot[origin] = state
+        data = self._fernet.encrypt(json.dumps(snapshot).encode("utf-8"))
+        with self._lock:
+            self._snapshots[uid] = snapshot
+            self._db.execute(
+                "INSERT OR REPLACE INTO session_state VALUES (?, ?)", (uid, data)
+            )
+            self._db.commit()
+
+    def delete(self, uid: str):
+        with self._lock:
+            self._snapshots.pop(uid, None)
+            self._db.execute("DELETE FROM session_state WHERE uid = ?", (uid,))
+            self._db.commit()
+
+    def summary(self, uid: str):
+        # What is stored, without the secrets themselves
+        return {
+            origin: {
+                "cookies": len(state["cookies"]),
+                "local": len(state["local"]),
+                "session": len(state["session"]),
+                "saved_at": state["saved_at"],
+            }
+            for origin, state in self.load(uid).items()
+        }
@@ -0,0 +1,172 @@
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+from fastapi import HTTPException
+from selenium.common.exceptions import WebDriverException
+
+ISOLATION_MODES = ("tab", "process")
+
+
+def check_isolation(isolation):
+    if isolation is not None and isolation not in ISOLATION_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown isolation: {isolation}. Expected one of {ISOLATION_MODES}",
+        )
+
+
+class SharedBrowser:
+    """A driver whose tabs belong to different uids."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        # Held for a uid's whole unit of work: a driver has one current window,
+        # and elements found in one tab can't be used from another
+        self.lock = threading.RLock()
+        self.tabs: Dict[str, str] = {}  # uid -> window handle
+        self.spare = driver.current_window_handle  # the window it came with
+        self.active = self.spare
+        self.broken = False
+
+
+class TabMultiplexer:
+    """Maps uids onto tabs of a few shared drivers instead of a driver each.
+
+    Tabs of one driver share its cookie jar and storage, so only uids that may
+    see each other's logins should share; the caller decides which. Every
+    call for a uid has to run inside guard(uid), which holds the uid's driver
+    for the whole call, including one opened by the call itself.
+    """
+
+    def __init__(
+        self,
+        acquire: Callable[[], object],
+        release: Callable[..., None],
+        discard: Callable[[object], None],
+        tabs_per_browser: int,
+    ):
+        self._acquire = acquire
+        self._release = release
+        self._discard = discard
+        self.tabs_per_browser = tabs_per_browser
+        self._hosts: List[SharedBrowser] = []
+        self._owners: Dict[str, SharedBrowser] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()  # driver locks held by this thread
+
+    def __contains__(self, uid: str):
+        return uid in self._owners
+
+    def _reserve(self, uid: str):
+        with self._lock:
+            hosts = [
+                host
+                for host in self._hosts
+                if not host.broken and len(host.tabs) < self.tabs_per_browser
+            ]
+            if not hosts:
+                return None
+            host = min(hosts, key=lambda host: len(host.tabs))
+            host.tabs[uid] = None
+            self._owners[uid] = host
+            return host
+
+    def open(self, uid: str):
+        host = self._reserve(uid)
+        if host is None:
+            # Launching is slow, so it happens outside the lock
+            host = SharedBrowser(self._acquire())
+            with self._lock:
+                self._hosts.append(host)
+                host.tabs[uid] = None
+                self._owners[uid] = host
+        host.lock.acquire()
+        driver = host.driver
+        try:
+            if host.spare is not None:
+                handle, host.spare = host.spare, None
+                driver.switch_to.window(handle)
+            else:
+                driver.switch_to.new_window("tab")
+                handle = driver.current_window_handle
+            host.tabs[uid] = handle
+            host.active = handle
+        except WebDriverException:
+            self.close(uid, broken=True)
+            host.lock.release()
+            raise
+        held = getattr(self._local, "held", None)
+        if held is None:
+            host.lock.release()
+        else:
+            # The rest of the call uses the new tab, so keep the driver
+            held.append(host.lock)
+        return driver
+
+    @contextmanager
+    def guard(self, uid: str):
+        outer = getattr(self._local, "held", None)
+        held = outer if outer is not None else []
+        self._local.held = held
+        try:
+            host = self._owners.get(uid)
+            if host is not None:
+                host.lock.acquire()
+                held.append(host.lock)
+                self._switch(host, uid)
+            yield
+        finally:
+            if outer is None:
+                self._local.held = None
+                for lock in reversed(held):
+                    lock.release()
+
+    @staticmethod
+    def _switch(host: SharedBrowser, uid: str):
+        handle = host.tabs.get(uid)
+        if handle is None or host.active == handle or host.broken:
+            return
+        try:
+            host.driver.switch_to.window(handle)
+            host.active = handle
+        except WebDriverException:
+            # The work itself runs into the dead driver and recovers
+            host.broken = True
+
+    def close(self, uid: str, recycle: bool = True, broken: bool = False):
+        with self._lock:
+            host = self._owners.pop(uid, None)
+            if host is None:
+                return
+            host.broken = host.broken or broken
+            handle = host.tabs.pop(uid, None)
+            last = not host.tabs
+            if last:
+                self._hosts.remove(host)
+        if last:
+            # The driver goes back whole; the pool's reset clears the shared jar
+            if host.broken:
+                self._discard(host.driver)
+            else:
+                self._release(host.driver, recycle=recycle)
+            return
+        if host.broken or handle is None:
+            return
+        with host.lock:
+            try:
+                if host.active != handle:
+                    host.driver.switch_to.window(handle)
+                host.driver.close()
+            except WebDriverException:
+                host.broken = True
+            host.active = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "browsers": len(self._hosts),
+                "tabs": len(self._owners),
+                "broken": sum(host.broken for host in self._hosts),
+                "tabs_per_browser": self.tabs_per_browser,
+            }
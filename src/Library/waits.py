@@ -0,0 +1,134 @@
+import time
+
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+ELEMENT_CONDITIONS = {
+    "presence": EC.presence_of_element_located,
+    "visibility": EC.visibility_of_element_located,
+    "clickable": EC.element_to_be_clickable,
+}
+PAGE_CONDITIONS = ("dom_settled", "network_idle", "ready")
+CONDITIONS = tuple(ELEMENT_CONDITIONS) + PAGE_CONDITIONS
+
+# Default element condition for each FindDo action
+ACTION_CONDITIONS = {"click": "clickable", "fill": "visibility"}
+
+# Installs a MutationObserver once per document and reports how long the DOM
+# has been quiet. A fresh document counts as just mutated.
+DOM_QUIET_SCRIPT = """
+if (!window.__humanwebSettle) {
+    window.__humanwebSettle = {last: performance.now()};
+    new MutationObserver(function () {
+        window.__humanwebSettle.last = performance.now();
+    }).observe(document, {
+        subtree: true, childList: true, attributes: true, characterData: true
+    });
+}
+return performance.now() - window.__humanwebSettle.last;
+"""
+
+# Number of resources the page has requested so far, or -1 while still loading
+RESOURCE_COUNT_SCRIPT = """
+if (document.readyState !== "complete") { return -1; }
+return performance.getEntriesByType("resource").length;
+"""
+
+
+def wait_for_element(
+    browser, by, selector, condition="presence", timeout=2.0, poll=0.05
+):
+    return WebDriverWait(browser, timeout, poll_frequency=poll).until(
+        ELEMENT_CONDITIONS[condition]((by, selector)),
+        f"Timed out after {timeout}s waiting for {condition} of {selector}",
+    )
+
+
+def wait_for_cached_element(
+    browser, element, condition="presence", timeout=2.0, poll=0.05
+):
+    # Same conditions as wait_for_element for an element we already hold, so no
+    # locator is evaluated. Raises StaleElementReferenceException if it is gone:
+    # the visibility checks touch the element on their first poll anyway.
+    if condition == "presence":
+        element.is_enabled()
+        return element
+    if condition == "visibility":
+        check = EC.visibility_of
+    else:
+        check = EC.element_to_be_clickable
+    return WebDriverWait(browser, timeout, poll_frequency=poll).until(
+        check(element),
+        f"Timed out after {timeout}s waiting for {condition} of cached element",
+    )
+
+
+def wait_for_dom_settled(browser, settle_ms=500, timeout=10.0, poll=0.05):
+    def quiet(driver):
+        return driver.execute_script(DOM_QUIET_SCRIPT) >= settle_ms
+
+    WebDriverWait(browser, timeout, poll_frequency=poll).until(
+        quiet, f"DOM kept changing for {timeout}s"
+    )
+
+
+def wait_for_network_idle(browser, settle_ms=500, timeout=10.0, poll=0.05):
+    # Idle means the document finished loading and no new resource entries
+    # showed up for settle_ms
+    state = {"count": None, "since": time.monotonic()}
+
+    def idle(driver):
+        count = driver.execute_script(RESOURCE_COUNT_SCRIPT)
+        now = time.monotonic()
+        if count < 0 or count != state["count"]:
+            state["count"], state["since"] = count, now
+            return False
+        return (now - state["since"]) * 1000 >= settle_ms
+
+    WebDriverWait(browser, timeout, poll_frequency=poll).until(
+        idle, f"Network did not go idle within {timeout}s"
+    )
+
+
+def wait_for_ready(browser, timeout=10.0, poll=0.05):
+    WebDriverWait(browser, timeout, poll_frequency=poll).until(
+        lambda driver: driver.execute_script("return document.readyState")
+        == "complete",
+        f"Page did not finish loading within {timeout}s",
+    )
+
+
+def wait_for(
+    browser, condition, by=None, selector=None, timeout=2.0, settle_ms=500, poll=0.05
+):
+    if condition in ELEMENT_CONDITIONS:
+        return wait_for_element(browser, by, selector, condition, timeout, poll)
+    if condition == "dom_settled":
+        return wait_for_dom_settled(browser, settle_ms, timeout, poll)
+    if condition == "network_idle":
+        return wait_for_network_idle(browser, settle_ms, timeout, poll)
+    if condition == "ready":
+        return wait_for_ready(browser, timeout, poll)
+    raise ValueError(
+        f"Unknown wait condition: {condition}. Expected one of {CONDITIONS}"
+    )
+
+
+def wait_with_options(browser, options, by=None, selector=None, default="presence"):
+    # options is anything with condition/timeout/settle_ms/poll_ms, e.g. the
+    # service's WaitOptions model. Page conditions run first, then the element
+    # is located with the default condition for the action.
+    condition = options.condition or default
+    poll = options.poll_ms / 1000
+    if condition in PAGE_CONDITIONS:
+        wait_for(
+            browser,
+            condition,
+            timeout=options.timeout,
+            settle_ms=options.settle_ms,
+            poll=poll,
+        )
+        condition = default
+    if selector is None:
+        return None
+    return wait_for_element(browser, by, selector, condition, options.timeout, poll)
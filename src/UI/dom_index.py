@@ -0,0 +1,136 @@
+import hashlib
+import importlib.util
+import re
+
+from bs4 import BeautifulSoup
+
+PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+INTERACTIVE_TAGS = {"a", "button", "input", "textarea", "select", "option", "label"}
+INTERACTIVE_ROLES = {
+    "button",
+    "link",
+    "textbox",
+    "searchbox",
+    "checkbox",
+    "radio",
+    "tab",
+    "menuitem",
+    "combobox",
+    "option",
+}
+SKIPPED_TAGS = ["script", "style", "noscript", "svg", "head", "template"]
+TEXT_LIMIT = 80
+STRUCTURAL_KEYS = ("tag", "id", "name", "class", "aria_label", "type")
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def _text(element, limit=TEXT_LIMIT):
+    # Stop early so large containers with an id don't cost a full subtree walk
+    parts = []
+    length = 0
+    for string in element.stripped_strings:
+        parts.append(" ".join(string.split()))
+        length += len(parts[-1]) + 1
+        if length >= limit:
+            break
+    return " ".join(parts)[:limit]
+
+
+def _is_candidate(element):
+    if element.name in INTERACTIVE_TAGS:
+        return True
+    if element.get("role") in INTERACTIVE_ROLES:
+        return True
+    if any(element.has_attr(a) for a in ("id", "name", "aria-label", "onclick")):
+        return True
+    # Classed elements that carry their own text, e.g. a post body
+    return element.has_attr("class") and any(
+        isinstance(child, str) and child.strip() for child in element.children
+    )
+
+
+def build_candidate_index(html):
+    """Compact description of every element the model could point at."""
+    soup = BeautifulSoup(html, PARSER)
+    for hidden in soup(SKIPPED_TAGS):
+        hidden.decompose()
+
+    candidates = []
+    for element in soup.find_all(True):
+        if not _is_candidate(element):
+            continue
+        if element.get("type") == "hidden":
+            continue
+        text = _text(element)
+        candidate = {
+            "tag": element.name,
+            "id": element.get("id"),
+            "name": element.get("name"),
+            "class": " ".join(element.get("class", [])) or None,
+            "aria_label": element.get("aria-label"),
+            "link_text": text if element.name == "a" else None,
+            "placeholder": element.get("placeholder"),
+            "type": element.get("type"),
+            "text": text or None,
+        }
+        candidates.append({k: v for k, v in candidate.items() if v})
+    return candidates
+
+
+def structural_fingerprint(candidates):
+    # Only the shape of the page counts, so new posts or changed text keep it stable
+    shape = sorted(
+        {
+            "|".join(candidate.get(key, "") for key in STRUCTURAL_KEYS)
+            for candidate in candidates
+        }
+    )
+    return hashlib.blake2b("\n".join(shape).encode(), digest_size=12).hexdigest()
+
+
+def _words(text):
+    return set(WORD.findall(text.lower()))
+
+
+def rank_candidates(candidates, query):
+    query_words = _words(query)
+    scored = []
+    for position, candidate in enumerate(candidates):
+        score = 0.0
+        for key, value in candidate.items():
+            if key == "tag":
+                score += 2.0 if value in query_words else 0.0
+                continue
+            overlap = len(query_words & _words(value))
+            # Attributes written by the page author say more than free text
+            weight = 1.0 if key == "text" else 2.0
+            score += overlap * weight
+        if "id" in candidate or "name" in candidate:
+            score += 0.5
+        scored.append((-score, position, candidate))
+    scored.sort(key=lambda item: (item[0], item[1]))
+    return [candidate for _, _, candidate in scored]
+
+
+def format_candidates(candidates, token_budget=2000):
+    # Roughly four characters per token is close enough to keep the prompt bounded
+    lines = []
+    seen = set()
+    used = 0
+    for candidate in candidates:
+        fields = " ".join(
+            f'{key}="{value}"' for key, value in candidate.items() if key != "tag"
+        )
+        description = f"<{candidate['tag']}> {fields}"
+        # Repeated widgets (one Like button per post) only need to be shown once
+        if description in seen:
+            continue
+        seen.add(description)
+        line = f"[{len(lines)}] {description}"
+        cost = len(line) // 4 + 1
+        if used + cost > token_budget:
+            break
+        lines.append(line)
+        used += cost
+    return "\n".join(lines)
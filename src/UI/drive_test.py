@@ -1,19 +1,19 @@
-import requests
 import json
-import time
+from service_client import DEFAULT_BASE_URL, ServiceClient
 
 class BrowserClient:
-    def __init__(self, base_url="http://localhost:8676"):
+    def __init__(self, base_url=DEFAULT_BASE_URL, client=None):
         self.base_url = base_url
+        self.client = client or ServiceClient(base_url)
         self.uid = None
 
     def navigate(self, url):
-        endpoint = f"{self.base_url}/v1/connectors/browser/navigate/"
+        endpoint = "/v1/connectors/browser/navigate/"
         payload = {
             "url": url,
             "uid": self.uid if self.uid else "default"
         }
-        response = requests.post(endpoint, json=payload)
+        response = self.client.post(endpoint, json=payload)
         if response.status_code == 200:
             data = response.json()
             self.uid = payload["uid"]
@@ -24,8 +24,8 @@ class BrowserClient:
     def get_source(self):
         if not self.uid:
             raise Exception("No active browser session. Navigate to a page first.")
-        endpoint = f"{self.base_url}/v1/connectors/browser/source/{self.uid}"
-        response = requests.get(endpoint)
+        endpoint = f"/v1/connectors/browser/source/{self.uid}"
+        response = self.client.get(endpoint)
         if response.status_code == 200:
             return response.json()["source"]
         else:
@@ -34,17 +34,34 @@ class BrowserClient:
     def get_human_readable_content(self):
         if not self.uid:
             raise Exception("No active browser session. Navigate to a page first.")
-        endpoint = f"{self.base_url}/v1/connectors/browser/human_source/{self.uid}"
-        response = requests.get(endpoint)
+        endpoint = f"/v1/connectors/browser/human_source/{self.uid}"
+        response = self.client.get(endpoint)
         if response.status_code == 200:
             return response.json()["source"]
         else:
             raise Exception(f"Failed to get human readable content: {response.status_code} - {response.text}")
 
+    def get_source_and_content(self):
+        # Independent reads, sent together over the pooled connections
+        if not self.uid:
+            raise Exception("No active browser session. Navigate to a page first.")
+        responses = self.client.fetch_many(
+            [
+                f"/v1/connectors/browser/source/{self.uid}",
+                f"/v1/connectors/browser/human_source/{self.uid}",
+            ]
+        )
+        for response in responses:
+            if response.status_code != 200:
+                raise Exception(
+                    f"Failed to read page: {response.status_code} - {response.text}"
+                )
+        return [response.json()["source"] for response in responses]
+
     def find_and_do_action(self, search, by, action, text=None):
         if not self.uid:
             raise Exception("No active browser session. Navigate to a page first.")
-        endpoint = f"{self.base_url}/v1/connectors/browser/FindDo/"
+        endpoint = "/v1/connectors/browser/FindDo/"
         payload = {
             "Search": search,
             "By": by,
@@ -52,10 +69,28 @@ class BrowserClient:
             "Text": text if text else [],
             "uid": self.uid
         }
-        response = requests.post(endpoint, json=payload)
+        response = self.client.post(endpoint, json=payload)
         if response.status_code != 200:
             raise Exception(f"Action failed: {response.status_code} - {response.text}")
 
+    def wait(self, condition, search=None, by="xpath", timeout=10, settle_ms=500):
+        # Returns as soon as the condition holds instead of sleeping a fixed time
+        if not self.uid:
+            raise Exception("No active browser session. Navigate to a page first.")
+        endpoint = "/v1/connectors/browser/wait/"
+        payload = {
+            "uid": self.uid,
+            "condition": condition,
+            "By": by if search else None,
+            "Search": search,
+            "timeout": timeout,
+            "settle_ms": settle_ms,
+        }
+        response = self.client.post(endpoint, json=payload)
+        if response.status_code != 200:
+            raise Exception(f"Wait failed: {response.status_code} - {response.text}")
+        return response.json()["elapsed_ms"]
+
 # Usage example
 if __name__ == "__main__":
     client = BrowserClient()
@@ -64,8 +99,8 @@ if __name__ == "__main__":
     source = client.navigate("https://www.linkedin.com")
     print("Navigated to LinkedIn")
 
-    # Wait for page to load (you might need to adjust this)
-    time.sleep(5)
+    # Wait for the page to stop changing
+    client.wait("dom_settled")
 
     # Get the human-readable content
     content = client.get_human_readable_content()
@@ -77,7 +112,7 @@ if __name__ == "__main__":
     print("Clicked on Sign in button")
 
     # Wait for the next page to load
-    time.sleep(3)
+    client.wait("dom_settled")
 
     # Get the updated content
     updated_content = client.get_human_readable_content()
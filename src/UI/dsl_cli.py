@@ -0,0 +1,296 @@
+import argparse
+import asyncio
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+from service_client import DEFAULT_BASE_URL, AsyncServiceClient
+
+# The DSL grammar is shared with the browser service, which runs the scripts
+LIBRARY_DIR = os.path.join(os.path.dirname(__file__), "..", "Library")
+sys.path.insert(0, os.path.abspath(LIBRARY_DIR))
+
+from dsl_parser import DSLSyntaxError, compile_script  # noqa: E402
+
+RUN_SCRIPT = "/v1/connectors/browser/run_script/"
+RELEASE = "/v1/connectors/browser/release/"
+
+
+@dataclass
+class Run:
+    run_id: str
+    uid: str
+    script_path: str
+    script: str
+    variables: Dict[str, str] = field(default_factory=dict)
+    # False for uids from the params file: those sessions outlive the run
+    owns_uid: bool = True
+    next_line: int = 0
+    status: str = "queued"
+    prompt: Optional[str] = None
+    error: Optional[str] = None
+    events: List[dict] = field(default_factory=list)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+
+
+def result_path(out_dir, run_id):
+    return os.path.join(out_dir, f"{run_id}.json")
+
+
+def continue_marker(out_dir, run_id):
+    return os.path.join(out_dir, f"{run_id}.continue")
+
+
+def write_result(out_dir, run):
+    path = result_path(out_dir, run.run_id)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(asdict(run), f, indent=2, default=str)
+    os.replace(f"{path}.tmp", path)
+
+
+def load_params(path):
+    if not path:
+        return [{}]
+    with open(path, newline="", encoding="utf-8") as f:
+        return [dict(row) for row in csv.DictReader(f)]
+
+
+def plan_runs(script_paths, params, uid_prefix):
+    runs = []
+    for script_path in script_paths:
+        with open(script_path, encoding="utf-8") as f:
+            script = f.read()
+        stem = os.path.splitext(os.path.basename(script_path))[0]
+        for index, row in enumerate(params):
+            row = dict(row)
+            run_id = f"{stem}-{index}" if len(params) > 1 else stem
+            uid = row.pop("uid", None)
+            runs.append(
+                Run(
+                    run_id,
+                    uid or f"{uid_prefix}-{run_id}",
+                    script_path,
+                    script,
+                    variables=row,
+                    owns_uid=not uid,
+                )
+            )
+    return runs
+
+
+def run_client_step(run, command):
+    # FIND_AND_SAVE and GENERATE_COMMENT run here, like in the Streamlit UI.
+    # Imported lazily because scraping_utils starts its own browser on import.
+    from ui_experiment import WebAutomationDSL
+
+    # Runs reach this from parallel threads, so each call gets a DSL of its own
+    dsl = WebAutomationDSL()
+    dsl.uid = run.uid
+    dsl.variables = run.variables
+    return dsl.execute(command)
+
+
+async def release(client, run):
+    # A finished run's browser would otherwise stay open on the service
+    try:
+        await client.post(RELEASE, json={"uid": run.uid})
+    except Exception as e:
+        print(f"[warn] could not release {run.uid}: {e}", file=sys.stderr)
+
+
+async def advance(client, run, out_dir):
+    """Run until the script finishes, fails or reaches ASK_USER.
+
+    The first failing step fails the run; the uid is released unless the run
+    is held.
+    """
+    program = compile_script(run.script, tuple(run.variables))
+    run.status = "running"
+    run.started = run.started or time.time()
+    try:
+        while run.next_line < len(program.commands):
+            payload = {
+                "uid": run.uid,
+                "steps": program.as_steps(),
+                "start_line": run.next_line,
+                "variables": {k: str(v) for k, v in run.variables.items()},
+                "stop_on_error": True,
+            }
+            paused = None
+            async for event in client.stream_lines(RUN_SCRIPT, payload):
+                run.events.append(event)
+                if event["status"] == "error":
+                    run.error = f"line {event['line'] + 1}: {event['result']}"
+                if event["status"] in ("ok", "error"):
+                    run.next_line = event["line"] + 1
+                elif event["status"] == "done":
+                    run.variables.update(event["variables"])
+                    run.next_line = len(program.commands)
+                else:
+                    paused = event
+            if paused is None:
+                break
+            run.variables.update(paused["variables"])
+            if paused["status"] == "waiting_for_user":
+                run.status = "held"
+                run.prompt = paused["result"]
+                run.next_line = paused["line"] + 1
+                return
+            command = program.commands[paused["line"]]
+            started = time.perf_counter()
+            result = await asyncio.to_thread(run_client_step, run, command)
+            run.events.append(
+                {
+                    "line": paused["line"],
+                    "command": command.name,
+                    "status": "ok",
+                    "result": str(result),
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                }
+            )
+            run.next_line = paused["line"] + 1
+        run.status = "failed" if run.error else "done"
+        run.prompt = None
+        run.finished = time.time()
+    except Exception as e:
+        run.status = "failed"
+        run.error = str(e)
+        run.finished = time.time()
+    finally:
+        if run.status in ("done", "failed") and run.owns_uid:
+            await release(client, run)
+        write_result(out_dir, run)
+
+
+async def hold(run, out_dir, queue, poll=1.0):
+    # The run keeps its browser session but gives up its slot until a human
+    # confirms by creating the .continue marker file (see the confirm command)
+    marker = continue_marker(out_dir, run.run_id)
+    print(f"[held] {run.run_id} ({run.uid}): {run.prompt}")
+    print(f"       confirm with: python dsl_cli.py confirm {out_dir} {run.run_id}")
+    while not os.path.exists(marker):
+        await asyncio.sleep(poll)
+    os.remove(marker)
+    run.status = "queued"
+    await queue.put(run)
+
+
+async def execute(runs, base_url, concurrency, out_dir, wait_for_user):
+    os.makedirs(out_dir, exist_ok=True)
+    queue = asyncio.Queue()
+    for run in runs:
+        write_result(out_dir, run)
+        queue.put_nowait(run)
+    holds = set()
+
+    async with AsyncServiceClient(base_url, pool_size=concurrency * 2) as client:
+
+        async def worker():
+            while True:
+                run = await queue.get()
+                try:
+                    await advance(client, run, out_dir)
+                    if run.status == "held" and wait_for_user:
+                        holds.add(asyncio.create_task(hold(run, out_dir, queue)))
+                    else:
+                        print(f"[{run.status}] {run.run_id} ({run.uid})")
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        while True:
+            await queue.join()
+            pending = [task for task in holds if not task.done()]
+            if not pending:
+                break
+            await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in workers:
+            task.cancel()
+
+    summary = {}
+    for run in runs:
+        summary[run.status] = summary.get(run.status, 0) + 1
+    print(json.dumps(summary))
+    return runs
+
+
+def load_held(out_dir, run_ids):
+    runs = []
+    for path in sorted(glob.glob(os.path.join(out_dir, "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data["status"] == "held" and (not run_ids or data["run_id"] in run_ids):
+            runs.append(Run(**data))
+    return runs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run DSL scripts concurrently against the browser service."
+    )
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    commands = parser.add_subparsers(dest="action", required=True)
+
+    run_parser = commands.add_parser("run", help="run scripts")
+    run_parser.add_argument("scripts", nargs="+", help="DSL script files")
+    run_parser.add_argument(
+        "--params", help="CSV file, one run per row per script; columns are variables"
+    )
+    run_parser.add_argument("--concurrency", type=int, default=4)
+    run_parser.add_argument("--out", default="dsl_runs", help="result directory")
+    run_parser.add_argument("--uid-prefix", default="cli")
+    run_parser.add_argument(
+        "--no-wait",
+        action="store_true",
+        help="leave runs that reach ASK_USER held and exit; continue with resume",
+    )
+
+    resume_parser = commands.add_parser("resume", help="continue held runs")
+    resume_parser.add_argument("out", help="result directory")
+    resume_parser.add_argument("run_ids", nargs="*")
+    resume_parser.add_argument("--concurrency", type=int, default=4)
+
+    confirm_parser = commands.add_parser(
+        "confirm", help="let a held run continue in a running 'run' command"
+    )
+    confirm_parser.add_argument("out", help="result directory")
+    confirm_parser.add_argument("run_ids", nargs="+")
+
+    args = parser.parse_args(argv)
+
+    if args.action == "confirm":
+        for run_id in args.run_ids:
+            open(continue_marker(args.out, run_id), "w").close()
+        return 0
+
+    if args.action == "resume":
+        runs = load_held(args.out, set(args.run_ids))
+        for run in runs:
+            run.status = "queued"
+        wait_for_user, out_dir = True, args.out
+    else:
+        runs = plan_runs(args.scripts, load_params(args.params), args.uid_prefix)
+        wait_for_user, out_dir = not args.no_wait, args.out
+
+    # Check every script up front so a typo fails before any browser work
+    for run in runs:
+        try:
+            compile_script(run.script, tuple(run.variables))
+        except DSLSyntaxError as e:
+            print(f"{run.script_path} ({run.run_id}):\n{e}", file=sys.stderr)
+            return 2
+
+    runs = asyncio.run(
+        execute(runs, args.base_url, args.concurrency, out_dir, wait_for_user)
+    )
+    return 1 if any(run.status == "failed" for run in runs) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+DEFAULT_PATH = os.environ.get(
+    "HUMANWEB_LOCATOR_CACHE",
+    os.path.join(os.path.expanduser("~"), ".humanweb", "locators.sqlite3"),
+)
+VOLATILE_SEGMENT = re.compile(r"^(\d+|[0-9a-f]{8,}|[0-9a-f-]{36})$", re.IGNORECASE)
+
+
+def url_pattern(url):
+    # Ids and hashes in the path vary per page, the route shape does not
+    parts = urlsplit(url)
+    segments = [
+        "*" if VOLATILE_SEGMENT.match(segment) else segment
+        for segment in parts.path.split("/")
+    ]
+    return f"{parts.scheme}://{parts.netloc.lower()}{'/'.join(segments) or '/'}"
+
+
+class LocatorCache:
+    """Resolved FIND_AND_SAVE locators, in an LRU in front of a SQLite file.
+
+    Entries are keyed by (URL pattern, query, structural DOM fingerprint), so a
+    page whose layout changed misses the cache instead of reusing a stale locator.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, capacity=512):
+        self.capacity = capacity
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS locators ("
+                "pattern TEXT, query TEXT, fingerprint TEXT, "
+                "attribute TEXT NOT NULL, value TEXT NOT NULL, updated REAL, "
+                "PRIMARY KEY (pattern, query, fingerprint))"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def key(url, query, fingerprint):
+        return (url_pattern(url), " ".join(query.lower().split()), fingerprint)
+
+    def get(self, url, query, fingerprint):
+        key = self.key(url, query, fingerprint)
+        with self._lock:
+            locator = self._memory.get(key)
+            if locator is not None:
+                self._memory.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute(
+                    "SELECT attribute, value FROM locators "
+                    "WHERE pattern = ? AND query = ? AND fingerprint = ?",
+                    key,
+                ).fetchone()
+                if row is not None:
+                    locator = (row[0], row[1])
+                    self._remember(key, locator)
+            if locator is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return locator
+
+    def put(self, url, query, fingerprint, attribute, value):
+        key = self.key(url, query, fingerprint)
+        with self._lock:
+            self._remember(key, (attribute, value))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO locators VALUES (?, ?, ?, ?, ?, ?)",
+                    (*key, attribute, value, time.time()),
+                )
+                self._db.commit()
+
+    def delete(self, url, query, fingerprint):
+        key = self.key(url, query, fingerprint)
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._db is not None:
+                self._db.execute(
+                    "DELETE FROM locators "
+                    "WHERE pattern = ? AND query = ? AND fingerprint = ?",
+                    key,
+                )
+                self._db.commit()
+
+    def stats(self):
+        return {"entries": len(self._memory), "hits": self.hits, "misses": self.misses}
+
+    def _remember(self, key, locator):
+        self._memory[key] = locator
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
@@ -6,6 +6,15 @@ from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException
+import atexit
+import threading
+from dom_index import (
+    build_candidate_index,
+    format_candidates,
+    rank_candidates,
+    structural_fingerprint,
+)
+from locator_cache import LocatorCache
 
 
 load_dotenv()
@@ -17,18 +26,67 @@ anthropic = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
 chrome_options = Options()
 chrome_options.add_argument("--headless")
 driver = webdriver.Chrome(options=chrome_options)
+# The driver is reused across lookups and closed when the process exits
+atexit.register(driver.quit)
+# Lookups come from several threads (CLI runs, Streamlit workers); one at a time
+driver_lock = threading.Lock()
+
+# Upper bound on the prompt tokens spent describing the page
+CANDIDATE_TOKEN_BUDGET = int(os.environ.get("HUMANWEB_CANDIDATE_TOKENS", "2000"))
+
+# Map the attribute to Selenium's By class
+attribute_map = {
+    'NAME': By.NAME,
+    'ID': By.ID,
+    'LINK_TEXT': By.LINK_TEXT,
+    'CLASS_NAME': By.CLASS_NAME
+}
+
+# Locators the model resolved before, reused while the page keeps its structure
+locator_cache = LocatorCache()
+
+
+def find_cached_element(url, query, fingerprint):
+    cached = locator_cache.get(url, query, fingerprint)
+    if cached is None:
+        return None
+    attribute, value = cached
+    try:
+        return driver.find_element(attribute_map[attribute], value)
+    except (KeyError, NoSuchElementException):
+        # The locator no longer matches, forget it and ask the model again
+        locator_cache.delete(url, query, fingerprint)
+        return None
+
 
 def get_element_and_analyze(url, query):
+    with driver_lock:
+        return analyze(url, query)
+
+
+def analyze(url, query):
     try:
         # Navigate to the URL
         driver.get(url)
 
+        index = build_candidate_index(driver.page_source)
+        fingerprint = structural_fingerprint(index)
+        element = find_cached_element(url, query, fingerprint)
+        if element is not None:
+            return {"found": 1, "value": element}
+
+        # Only a ranked, token-budgeted list of candidate elements goes to the
+        # model instead of the raw page source
+        candidates = format_candidates(
+            rank_candidates(index, query), token_budget=CANDIDATE_TOKEN_BUDGET
+        )
+
         # Use Anthropic to analyze the content
-        prompt = f"Find the element that matches with the query. Query: {query}. Find the element in the html: {driver.page_source}  Return a JSON object with the keys 'found' (should be 1 if the element is found, 0 otherwise), 'value' (containing the value of the NAME, ID, LINK_TEXT, or CLASS_NAME of the element), and 'attribute' (containing NAME, ID, LINK_TEXT, CLASS_NAME)."
-        
+        prompt = f"Find the element that matches with the query. Query: {query}. Candidate elements, one per line:\n{candidates}\nReturn only a JSON object with the keys 'found' (should be 1 if the element is found, 0 otherwise), 'value' (containing the value of the NAME, ID, LINK_TEXT, or CLASS_NAME of the element, using a single class name for CLASS_NAME), and 'attribute' (containing NAME, ID, LINK_TEXT, CLASS_NAME)."
+
         message = anthropic.messages.create(
             model="claude-3-5-sonnet-20240620",
-            max_tokens=8192,
+            max_tokens=256,
             messages=[{"role": "user", "content": prompt}]
         )
 
@@ -36,18 +94,13 @@ def get_element_and_analyze(url, query):
         response = json.loads(message.content[0].text)
 
         if response['found'] == 1:
-            # Map the attribute to Selenium's By class
-            attribute_map = {
-                'NAME': By.NAME,
-                'ID': By.ID,
-                'LINK_TEXT': By.LINK_TEXT,
-                'CLASS_NAME': By.CLASS_NAME
-            }
-
             by_strategy = attribute_map.get(response['attribute'])
             if by_strategy:
                 try:
                     element = driver.find_element(by_strategy, response['value'])
+                    locator_cache.put(
+                        url, query, fingerprint, response['attribute'], response['value']
+                    )
                     return {"found": 1, "value": element}
                 except NoSuchElementException:
                     return {"found": 0, "message": "Element not found"}
@@ -57,7 +110,4 @@ def get_element_and_analyze(url, query):
             return {"found": 0, "message": "Element not found"}
 
     except Exception as e:
-        return {"found": 0, "message": "Error occurred"}
-
-    finally:
-        driver.quit()
\ No newline at end of file
+        return {"found": 0, "message": "Error occurred"}
\ No newline at end of file
@@ -0,0 +1,112 @@
+import queue
+import threading
+from contextlib import closing
+
+IDLE = "idle"
+RUNNING = "running"
+WAITING = "waiting_for_user"
+DONE = "done"
+STOPPED = "stopped"
+
+
+class ScriptWorker:
+    """Runs compiled DSL programs on a background thread for one UI session.
+
+    The worker owns its WebAutomationDSL, so the uid and variables live as long
+    as the Streamlit session instead of one render pass. Progress goes through
+    a thread-safe queue; the UI only drains and renders it. ASK_USER parks the
+    thread until confirm() is called.
+    """
+
+    def __init__(self, dsl):
+        self.dsl = dsl
+        self.events = queue.Queue()
+        self.status = IDLE
+        self.prompt = None
+        self.line = 0
+        self._thread = None
+        self._confirmed = threading.Event()
+        self._stop = threading.Event()
+
+    @property
+    def busy(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, program, wait=None):
+        if self.busy:
+            raise RuntimeError("A script is already running")
+        self._confirmed.clear()
+        self._stop.clear()
+        self.dsl.variables = {}
+        self.line = 0
+        self.prompt = None
+        self.status = RUNNING
+        self._thread = threading.Thread(
+            target=self._run, args=(program, wait), daemon=True
+        )
+        self._thread.start()
+
+    def confirm(self):
+        self._confirmed.set()
+
+    def stop(self):
+        self._stop.set()
+        self._confirmed.set()
+
+    def drain(self):
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _emit(self, line, result):
+        self.events.put({"line": line, "result": result})
+
+    def _run(self, program, wait):
+        try:
+            self._execute(program, wait)
+        except Exception as e:
+            self._emit(self.line, f"Script failed: {e}")
+            self.status = DONE
+        else:
+            self.status = STOPPED if self._stop.is_set() else DONE
+        self.prompt = None
+
+    def _execute(self, program, wait):
+        commands = program.commands
+        while self.line < len(commands) and not self._stop.is_set():
+            paused = None
+            # closing() drops the streamed response as soon as stop() is seen
+            with closing(self.dsl.run_program(program, self.line, wait)) as events:
+                for event in events:
+                    if event["status"] in ("ok", "error"):
+                        self._emit(event["line"], event["result"])
+                        self.line = event["line"] + 1
+                    elif event["status"] == "done":
+                        self.line = len(commands)
+                    else:
+                        paused = event
+                    if self._stop.is_set():
+                        return
+            if paused is None:
+                return
+            if paused["status"] == "failed":
+                self._emit(self.line, paused["result"])
+                return
+
+            self.line = paused["line"]
+            if paused["status"] == "waiting_for_user":
+                self.prompt = paused["result"]
+                self.status = WAITING
+                self._confirmed.wait()
+                self._confirmed.clear()
+                self.prompt = None
+                self.status = RUNNING
+                self.line += 1
+                continue
+
+            # Commands that need the UI side (LLM lookups, generated text)
+            self._emit(self.line, self.dsl.execute(commands[self.line]))
+            self.line += 1
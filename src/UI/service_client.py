@@ -0,0 +1,192 @@
+import asyncio
+import functools
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+except ImportError:  # only the sync client is available without httpx
+    httpx = None
+
+DEFAULT_BASE_URL = os.environ.get("HUMANWEB_SERVICE_URL", "http://localhost:8676")
+# (connect, read) seconds; reads are long because navigate waits for the page
+DEFAULT_TIMEOUT = (3.05, 120)
+# Statuses worth retrying; only idempotent requests are retried on them, while
+# connection failures are retried for every method
+RETRY_STATUSES = (502, 503, 504)
+EVENTS = "/v1/connectors/browser/events/{uid}"
+
+
+def parse_sse(lines):
+    # Server-Sent Events from the service: one JSON event per data line
+    for line in lines:
+        if line.startswith("data:"):
+            yield json.loads(line[5:])
+
+
+class ServiceClient:
+    """Connection-pooled, keep-alive client for the browser service."""
+
+    def __init__(
+        self,
+        base_url=DEFAULT_BASE_URL,
+        timeout=DEFAULT_TIMEOUT,
+        retries=3,
+        backoff=0.2,
+        pool_size=16,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.pool_size = pool_size
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._readers = None
+
+    def url(self, path):
+        return f"{self.base_url}{path}"
+
+    def get(self, path, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(self.url(path), **kwargs)
+
+    def post(self, path, json=None, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.post(self.url(path), json=json, **kwargs)
+
+    def stream_lines(self, path, json_body):
+        # NDJSON streams such as run_script, decoded one event at a time
+        with self.post(path, json=json_body, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def events(self, uid, types=None, last_event_id=None):
+        """Session events for uid ("*" for all) as they happen; blocks."""
+        headers = {"Last-Event-ID": str(last_event_id)} if last_event_id else {}
+        params = {"types": ",".join(types)} if types else None
+        # No read timeout: the stream is idle between events apart from keepalives
+        with self.session.get(
+            self.url(EVENTS.format(uid=uid)),
+            params=params,
+            headers=headers,
+            stream=True,
+            timeout=(self.timeout[0], None),
+        ) as response:
+            response.raise_for_status()
+            yield from parse_sse(response.iter_lines(decode_unicode=True))
+
+    def fetch_many(self, paths, **kwargs):
+        # Independent reads go out together over the pooled connections
+        if self._readers is None:
+            self._readers = ThreadPoolExecutor(
+                max_workers=self.pool_size, thread_name_prefix="service-client"
+            )
+        futures = [self._readers.submit(self.get, path, **kwargs) for path in paths]
+        return [future.result() for future in futures]
+
+    def close(self):
+        if self._readers is not None:
+            self._readers.shutdown(wait=False)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncServiceClient:
+    """asyncio counterpart of ServiceClient, built on httpx."""
+
+    def __init__(
+        self,
+        base_url=DEFAULT_BASE_URL,
+        timeout=DEFAULT_TIMEOUT,
+        retries=3,
+        backoff=0.2,
+        pool_size=64,
+    ):
+        if httpx is None:
+            raise RuntimeError("AsyncServiceClient requires httpx")
+        connect, read = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            timeout=httpx.Timeout(read, connect=connect),
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+            # Connection failures are retried by the transport itself
+            transport=httpx.AsyncHTTPTransport(retries=retries),
+        )
+
+    async def get(self, path, **kwargs):
+        for attempt in range(self.retries + 1):
+            response = await self.client.get(path, **kwargs)
+            if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                return response
+            await asyncio.sleep(self.backoff * 2**attempt)
+
+    async def post(self, path, json=None, **kwargs):
+        return await self.client.post(path, json=json, **kwargs)
+
+    async def stream_lines(self, path, json_body):
+        async with self.client.stream("POST", path, json=json_body) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line:
+                    yield json.loads(line)
+
+    async def events(self, uid, types=None, last_event_id=None):
+        headers = {"Last-Event-ID": str(last_event_id)} if last_event_id else {}
+        params = {"types": ",".join(types)} if types else None
+        async with self.client.stream(
+            "GET",
+            EVENTS.format(uid=uid),
+            params=params,
+            headers=headers,
+            timeout=httpx.Timeout(None, connect=self.client.timeout.connect),
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("data:"):
+                    yield json.loads(line[5:])
+
+    async def fetch_many(self, paths, **kwargs):
+        return await asyncio.gather(*(self.get(path, **kwargs) for path in paths))
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+@functools.lru_cache(maxsize=None)
+def default_client(base_url=DEFAULT_BASE_URL):
+    # Shared per process so Streamlit reruns keep their pooled connections
+    return ServiceClient(base_url)
@@ -1,33 +1,55 @@
+import os
+import sys
 import streamlit as st
-import requests
-import time
 import json
 from scraping_utils import get_element_and_analyze
+from script_worker import WAITING, ScriptWorker
+from service_client import default_client
 
-BASE_URL = "http://localhost:8676"
+# The DSL grammar is shared with the browser service, which runs the scripts
+LIBRARY_DIR = os.path.join(os.path.dirname(__file__), "..", "Library")
+sys.path.insert(0, os.path.abspath(LIBRARY_DIR))
+
+from dsl_parser import COMMANDS, DSLSyntaxError, compile_script  # noqa: E402
 
 
 class WebAutomationDSL:
-    def __init__(self):
+    def __init__(self, client=None):
+        # Pooled keep-alive connections with timeouts and retries
+        self.client = client or default_client()
         self.uid = None
         self.variables = {}
+        # Dispatch table built once instead of a getattr per step
+        self.handlers = {
+            "NAVIGATE": self.navigate,
+            "ASK_USER": self.ask_user,
+            "CLICK_XPATH": self.click_xpath,
+            "TYPE_XPATH": self.type_xpath,
+            "SAVE_TO_VARIABLE": self.save_to_variable,
+            "READ_XPATH": self.read_xpath,
+            "FIND_AND_SAVE": self.find_and_save,
+            "KEYBOARD_CLICK": self.keyboard_click,
+        }
 
-    def execute_command(self, command, args):
-        method = getattr(self, command.lower(), None)
-        if method:
-            return method(args)
-        else:
-            return f"Unknown command: {command}"
+    def execute(self, command):
+        return self.handlers[command.name](*command.render_args(self.variables))
 
-    def navigate(self, url):
+    def execute_command(self, command, args):
         try:
-            url = json.loads(url)
-        except json.JSONDecodeError:
-            pass
+            program = compile_script(f"{command} {args}", tuple(self.variables))
+        except DSLSyntaxError as e:
+            return str(e)
+        return self.execute(program.commands[0])
 
-        endpoint = f"{BASE_URL}/v1/connectors/browser/navigate/"
-        payload = {"url": url, "uid": self.uid if self.uid else "default"}
-        response = requests.post(endpoint, json=payload)
+    def navigate(self, url):
+        endpoint = "/v1/connectors/browser/navigate/"
+        # The page source is not used here, so don't have the service send it
+        payload = {
+            "url": url,
+            "uid": self.uid if self.uid else "default",
+            "source_mode": "none",
+        }
+        response = self.client.post(endpoint, json=payload)
         if response.status_code == 200:
             self.uid = payload["uid"]
             return f"Navigated to {url}"
@@ -37,9 +59,9 @@ class WebAutomationDSL:
     def read_xpath(self, xpath):
         if not self.uid:
             return "No active browser session. Navigate to a page first."
-        endpoint = f"{BASE_URL}/v1/connectors/browser/FindDo/"
+        endpoint = "/v1/connectors/browser/FindDo/"
         payload = {"Search": xpath, "By": "xpath", "Action": "", "uid": self.uid}
-        response = requests.post(endpoint, json=payload)
+        response = self.client.post(endpoint, json=payload)
         if response.status_code == 200:
             return response.json().get("text", "Element found but no text content")
         else:
@@ -48,7 +70,7 @@ class WebAutomationDSL:
     def click_xpath(self, xpath):
         if not self.uid:
             self.uid = "default"
-        endpoint = f"{BASE_URL}/v1/connectors/browser/FindDo/"
+        endpoint = "/v1/connectors/browser/FindDo/"
         payload = {
             "Search": xpath,
             "By": "xpath",
@@ -56,20 +78,16 @@ class WebAutomationDSL:
             "Text": "",
             "uid": self.uid,
         }
-        response = requests.post(endpoint, json=payload)
+        response = self.client.post(endpoint, json=payload)
         if response.status_code == 200:
             return f"Clicked element at {xpath}"
         else:
             return f"Failed to click: {response.status_code} - {response.text}"
 
-    def type_xpath(self, args):
+    def type_xpath(self, xpath, text):
         if not self.uid:
             self.uid = "default"
-        xpath, text = args.split('" "')
-        xpath = xpath.strip('"')
-        text = text.strip('"')
-        text = self.resolve_variables(text)
-        endpoint = f"{BASE_URL}/v1/connectors/browser/FindDo/"
+        endpoint = "/v1/connectors/browser/FindDo/"
         payload = {
             "Search": xpath,
             "By": "xpath",
@@ -77,31 +95,24 @@ class WebAutomationDSL:
             "Text": text,
             "uid": self.uid,
         }
-        response = requests.post(endpoint, json=payload)
+        response = self.client.post(endpoint, json=payload)
         if response.status_code == 200:
             return f"Typed '{text}' into element at {xpath}"
         else:
             return f"Failed to type: {response.status_code} - {response.text}"
 
-    def save_to_variable(self, args):
-        variable_name, value = args.split(" ", 1)
-        if value.startswith("READ_XPATH"):
-            _, xpath = value.split(" ", 1)
-            value = self.read_xpath(xpath.strip('"'))
-        elif value.startswith("GENERATE_COMMENT"):
-            _, context = value.split(" ", 1)
-            context = self.resolve_variables(context)
-            value = self.generate_comment(context)
+    def save_to_variable(self, variable_name, *value):
+        if value[0] == "READ_XPATH":
+            value = self.read_xpath(value[1])
+        elif value[0] == "GENERATE_COMMENT":
+            value = self.generate_comment(value[1])
+        else:
+            value = value[0]
         self.variables[variable_name] = value
         return f"Saved value to variable {variable_name}"
 
-    def find_and_save(self, args):
-        url, query, var_name = args.split('" "')
-        url = url[1:]
-        var_name = var_name[:-1]
-        parsed_result = get_element_and_analyze(
-            url, query.strip('"')
-        )  # Replace with actual URL as needed
+    def find_and_save(self, url, query, var_name):
+        parsed_result = get_element_and_analyze(url, query)
 
         # Assume result is a JSON string and parse it
         try:
@@ -116,12 +127,12 @@ class WebAutomationDSL:
     def keyboard_click(self, button):
         if not self.uid:
             self.uid = "default"
-        endpoint = f"{BASE_URL}/v1/connectors/browser/KeyboardClick/"
+        endpoint = "/v1/connectors/browser/KeyboardClick/"
         payload = {
             "uid": self.uid,
-            "button": button.strip('"'),  # Remove quotes if present
+            "button": button,
         }
-        response = requests.post(endpoint, json=payload)
+        response = self.client.post(endpoint, json=payload)
         if response.status_code == 200:
             return f"Pressed key: {button}"
         else:
@@ -130,19 +141,63 @@ class WebAutomationDSL:
     def generate_comment(self, context):
         return f"This is a generated comment based on: {context[:50]}..."
 
-    def resolve_variables(self, text):
-        for var, value in self.variables.items():
-            text = text.replace(f"${var}", str(value))
-        return text
-
     def ask_user(self, prompt):
         return prompt
 
+    def run_program(self, program, start=0, wait=None):
+        # Runs the compiled steps next to the driver and yields one event per step.
+        # The stream ends at ASK_USER and at steps that must run in the UI.
+        endpoint = "/v1/connectors/browser/run_script/"
+        payload = {
+            "uid": self.uid if self.uid else "default",
+            "steps": program.as_steps(),
+            "start_line": start,
+            "variables": {k: str(v) for k, v in self.variables.items()},
+            # e.g. {"condition": "dom_settled", "timeout": 10} for every step
+            "wait": wait,
+        }
+        with self.client.post(endpoint, json=payload, stream=True) as response:
+            if response.status_code != 200:
+                message = f"Script failed: {response.status_code} - {response.text}"
+                yield {"status": "failed", "result": message}
+                return
+            self.uid = payload["uid"]
+            for line in response.iter_lines():
+                if line:
+                    event = json.loads(line)
+                    if "variables" in event:
+                        self.variables.update(event["variables"])
+                    yield event
+
+
+POLL_SECONDS = 1
+
+
+def get_worker():
+    # One worker per browser tab; it outlives reruns in session_state
+    if "worker" not in st.session_state:
+        st.session_state.worker = ScriptWorker(WebAutomationDSL())
+        st.session_state.log = []
+    return st.session_state.worker
+
+
+def show_progress(worker, polling):
+    st.session_state.log.extend(worker.drain())
+    for event in st.session_state.log:
+        st.write(event["result"])
+    if worker.status == WAITING:
+        st.write(worker.prompt)
+        if st.button("Confirm", key=f"confirm_{worker.line}"):
+            worker.confirm()
+    elif polling and not worker.busy:
+        # Finished; a full rerun turns polling off and re-enables the buttons
+        st.rerun()
+
 
 def main():
     st.title("Web Automation DSL")
 
-    dsl = WebAutomationDSL()
+    worker = get_worker()
 
     # Initialize session state
     if "script" not in st.session_state:
@@ -156,84 +211,51 @@ CLICK_XPATH "//button[@aria-label='Comment']"
 SAVE_TO_VARIABLE generated_comment GENERATE_COMMENT $post_content
 TYPE_XPATH "//div[@aria-label='Add a comment']" "$generated_comment"
 """
-    if "current_line" not in st.session_state:
-        st.session_state.current_line = 0
-    if "waiting_for_user" not in st.session_state:
-        st.session_state.waiting_for_user = False
-    if "is_executing" not in st.session_state:
-        st.session_state.is_executing = False  # Add this line
 
     # Display and edit the script
     st.session_state.script = st.text_area(
         "DSL Script", st.session_state.script, height=300
     )
 
-    # Create two columns for buttons
-    col1, col2 = st.columns(2)
+    # Create three columns for buttons
+    col1, col2, col3 = st.columns(3)
 
     # Execute button in the first column
     with col1:
-        if st.button("Execute Script"):
-            st.session_state.current_line = 0
-            st.session_state.waiting_for_user = False
-            st.session_state.is_executing = True  # Set executing flag
-            st.rerun()
+        if st.button("Execute Script", disabled=worker.busy):
+            # Compile once up front so a bad line fails before any browser work
+            try:
+                program = compile_script(st.session_state.script)
+            except DSLSyntaxError as e:
+                st.error(str(e))
+            else:
+                worker.drain()
+                st.session_state.log = []
+                worker.start(program)
+                st.rerun()
 
-    # Clear button in the second column
+    # Stop button in the second column
     with col2:
+        if st.button("Stop", disabled=not worker.busy):
+            worker.stop()
+
+    # Clear button in the third column
+    with col3:
         if st.button("Clear Script"):
+            worker.stop()
             st.session_state.script = ""
-            st.session_state.current_line = 0
-            st.session_state.waiting_for_user = False
-            st.session_state.is_executing = False  # Reset executing flag
+            st.session_state.log = []
             st.rerun()
 
-    # Script execution
-    if st.session_state.is_executing:
-        lines = st.session_state.script.strip().split("\n")
-        while st.session_state.current_line < len(lines):
-            line = lines[st.session_state.current_line].strip()
-            if not line:
-                st.session_state.current_line += 1
-                continue
-            parts = line.split(" ", 1)
-            command = parts[0]
-            args = parts[1] if len(parts) > 1 else ""
-
-            if command == "ASK_USER":
-                user_prompt = args.strip('"')
-                st.write(user_prompt)
-                if st.button("Confirm", key=f"confirm_{st.session_state.current_line}"):
-                    st.session_state.waiting_for_user = False
-                    st.session_state.current_line += 1
-                    st.rerun()
-                else:
-                    st.session_state.waiting_for_user = True
-                break
-            else:
-                result = dsl.execute_command(command, args)
-                st.write(result)
-                st.session_state.current_line += 1
-
-            time.sleep(1)
-
-        # Reset execution if script is completed
-        if st.session_state.current_line >= len(lines):
-            st.session_state.current_line = 0
-            st.session_state.waiting_for_user = False
-            st.session_state.is_executing = False
+    # Only this part reruns while a script runs, so the page stays responsive
+    polling = worker.busy
+    progress = st.fragment(run_every=POLL_SECONDS if polling else None)(
+        show_progress
+    )
+    progress(worker, polling)
 
     # Define command structure
-    command_structure = {
-        "NAVIGATE": ["URL"],
-        "ASK_USER": ["Prompt"],
-        "CLICK_XPATH": ["XPath"],
-        "TYPE_XPATH": ["XPath", "Text"],
-        "SAVE_TO_VARIABLE": ["Variable Name", "Value"],
-        "READ_XPATH": ["XPath"],
-        "FIND_AND_SAVE": ["URL", "Query", "Variable Name"],
-        "KEYBOARD_CLICK": ["Keyboard Button"],
-    }
+    command_structure = COMMANDS
 
     # Command addition section
     st.subheader("Add New Command")
@@ -0,0 +1,67 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+LIBRARY_DIR = os.path.join(os.path.dirname(__file__), "..", "Library")
+sys.path.insert(0, os.path.abspath(LIBRARY_DIR))
+
+import readable  # noqa: E402
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), "pages")
+
+
+def load_corpus(directory):
+    pages = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith((".html", ".htm")):
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                pages[name] = f.read()
+    return pages
+
+
+def time_call(fn, source, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(source)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def time_cached(source, repeat):
+    # First call parses, the rest are served from the per-uid cache
+    cache = readable.ReadableCache()
+    cache.get("bench", source)
+    return time_call(lambda s: cache.get("bench", s), source, repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare readable-content extraction engines on saved pages."
+    )
+    parser.add_argument("--pages", default=PAGES_DIR, help="directory of .html files")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engines = [("soup", readable.extract_with_soup)]
+    if readable.lxml_html is not None:
+        engines.append(("lxml", readable.extract_with_lxml))
+    else:
+        print("lxml is not installed, only the BeautifulSoup path is measured")
+
+    header = f"{'page':<24}{'size KB':>10}" + "".join(
+        f"{name + ' ms':>12}" for name, _ in engines
+    )
+    print(header + f"{'cached ms':>12}")
+    for name, source in load_corpus(args.pages).items():
+        row = f"{name:<24}{len(source) / 1024:>10.1f}"
+        for _, fn in engines:
+            row += f"{time_call(fn, source, args.repeat):>12.2f}"
+        row += f"{time_cached(source, args.repeat):>12.3f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import argparse
+import functools
+import http.server
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "Library"))
+sys.path.insert(0, os.path.join(HERE, "..", "UI"))
+
+import uvicorn  # noqa: E402
+
+import browser_service  # noqa: E402
+from browser_pool import BrowserPool, reset_driver  # noqa: E402
+from mock_driver import MockDriver  # noqa: E402
+from service_client import ServiceClient  # noqa: E402
+
+PAGES_DIR = os.path.join(HERE, "pages")
+RESULTS_DIR = os.path.join(HERE, "results")
+BACKENDS = ("mock", "firefox", "chrome")
+SCENARIOS = ("navigate", "find_do", "human_source", "screenshot", "script")
+API = "/v1/connectors/browser"
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixtures(directory):
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def driver_factory(backend):
+    from selenium import webdriver
+
+    if backend == "mock":
+        return MockDriver
+    if backend == "firefox":
+        options = webdriver.FirefoxOptions()
+        options.add_argument("--headless")
+        return lambda: webdriver.Firefox(options=options)
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--window-size=1280,800")
+    return lambda: webdriver.Chrome(options=options)
+
+
+def start_service(factory, pool_size):
+    # Swap in a pool for the chosen backend before the app's lifespan starts it
+    browser_service.browser_pool = BrowserPool(
+        factory, size=pool_size, reset=reset_driver
+    )
+    config = uvicorn.Config(
+        browser_service.app, host="127.0.0.1", port=0, log_level="warning"
+    )
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+def navigate(client, uid, url):
+    client.post(f"{API}/navigate/", json={"uid": uid, "url": url}).raise_for_status()
+
+
+def find_do(client, uid, url):
+    details = {
+        "uid": uid,
+        "By": "xpath",
+        "Search": "//body",
+        "Action": "click",
+        "Text": "",
+    }
+    client.post(f"{API}/FindDo/", json=details).raise_for_status()
+
+
+def human_source(client, uid, url):
+    client.get(f"{API}/human_source/{uid}").raise_for_status()
+
+
+def screenshot(client, uid, url):
+    # max_age_ms=0 so every call captures and encodes a fresh frame
+    client.get(f"{API}/screenshot/{uid}", params={"max_age_ms": 0}).raise_for_status()
+
+
+def script(client, uid, url):
+    body = {
+        "uid": uid,
+        "script": f"NAVIGATE {url}\nREAD_XPATH //body\nCLICK_XPATH //body",
+    }
+    for event in client.stream_lines(f"{API}/run_script/", body):
+        if event["status"] == "error":
+            raise RuntimeError(event["result"])
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = max(int(round(fraction * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def run_scenario(client, name, urls, requests, concurrency):
+    operation = globals()[name]
+    per_worker = max(requests // concurrency, 1)
+
+    def worker(index):
+        uid = f"bench-{index}"
+        # Every session starts on a page; only the measured calls are timed
+        navigate(client, uid, urls[index % len(urls)])
+        samples, errors = [], 0
+        for i in range(per_worker):
+            url = urls[(index + i) % len(urls)]
+            started = time.perf_counter()
+            try:
+                operation(client, uid, url)
+                samples.append((time.perf_counter() - started) * 1000)
+            except Exception:
+                errors += 1
+        return samples, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as workers:
+        outcomes = list(workers.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+    samples = [sample for outcome, _ in outcomes for sample in outcome]
+    errors = sum(errors for _, errors in outcomes)
+    if not samples:
+        return {"requests": 0, "errors": errors}
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "p50_ms": round(percentile(samples, 0.50), 3),
+        "p99_ms": round(percentile(samples, 0.99), 3),
+        "mean_ms": round(sum(samples) / len(samples), 3),
+    }
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=HERE,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=HERE,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def results_path(results_dir, revision, backend):
+    return os.path.join(results_dir, f"{revision}-{backend}.json")
+
+
+def load_baseline(baseline, results_dir, backend):
+    path = baseline
+    if not os.path.exists(path):
+        path = results_path(results_dir, baseline, backend)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def print_report(report, baseline=None):
+    header = f"{'scenario':<14}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}"
+    if baseline:
+        header += f"{'p50 vs ' + baseline['revision']:>22}"
+    print(header)
+    for name, result in report["results"].items():
+        if not result["requests"]:
+            print(f"{name:<14}{'-':>10}{'-':>10}{'-':>10}{result['errors']:>8}")
+            continue
+        row = (
+            f"{name:<14}{result['throughput_rps']:>10.1f}{result['p50_ms']:>10.2f}"
+            f"{result['p99_ms']:>10.2f}{result['errors']:>8}"
+        )
+        before = baseline["results"].get(name) if baseline else None
+        if before and before.get("requests"):
+            change = (result["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100
+            row += f"{change:>+21.1f}%"
+        print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the browser service against local fixture pages."
+    )
+    parser.add_argument("--backend", choices=BACKENDS, default="mock")
+    parser.add_argument("--pages", default=PAGES_DIR, help="directory of .html files")
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument("--requests", type=int, default=200, help="per scenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--results", default=RESULTS_DIR, help="results directory")
+    parser.add_argument(
+        "--baseline", help="results file or revision to compare p50 latency against"
+    )
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    fixtures, fixtures_url = serve_fixtures(args.pages)
+    urls = [
+        f"{fixtures_url}/{name}"
+        for name in sorted(os.listdir(args.pages))
+        if name.endswith((".html", ".htm"))
+    ]
+    server, thread, service_url = start_service(
+        driver_factory(args.backend), args.concurrency
+    )
+    report = {
+        "revision": git_revision(),
+        "backend": args.backend,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "pages": [os.path.basename(url) for url in urls],
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": {},
+    }
+    try:
+        with ServiceClient(service_url, pool_size=args.concurrency) as client:
+            for name in args.scenarios:
+                report["results"][name] = run_scenario(
+                    client, name, urls, args.requests, args.concurrency
+                )
+            for index in range(args.concurrency):
+                client.post(f"{API}/release/", json={"uid": f"bench-{index}"})
+    finally:
+        server.should_exit = True
+        thread.join()
+        fixtures.shutdown()
+
+    baseline = None
+    if args.baseline:
+        baseline = load_baseline(args.baseline, args.results, args.backend)
+    print_report(report, baseline)
+    if not args.no_save:
+        os.makedirs(args.results, exist_ok=True)
+        path = results_path(args.results, report["revision"], args.backend)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"saved {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import struct
+import urllib.request
+import zlib
+
+from selenium.common.exceptions import NoSuchWindowException, WebDriverException
+from selenium.webdriver.remote.webelement import WebElement
+
+# Stand-in for a Selenium driver, so benchmarks measure the service itself:
+# routing, executors, caches, parsing and encoding. Pages are still fetched
+# over HTTP from the fixture server, but nothing is rendered.
+
+
+def blank_png(width=1280, height=800):
+    row = b"\x00" + b"\xff\xff\xff" * width
+    raw = zlib.compress(row * height, 6)
+
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", raw)
+        + chunk(b"IEND", b"")
+    )
+
+
+SCREENSHOT = blank_png()
+
+
+class MockElement(WebElement):
+    # A WebElement subclass, because expected conditions tell elements from
+    # locators with isinstance
+    def __init__(self, driver, selector):
+        super().__init__(driver, selector)
+        self.selector = selector
+
+    @property
+    def text(self):
+        return self.selector
+
+    @property
+    def tag_name(self):
+        return "div"
+
+    @property
+    def rect(self):
+        return {"x": 0, "y": 0, "width": 100, "height": 20}
+
+    @property
+    def screenshot_as_png(self):
+        return SCREENSHOT
+
+    def click(self):
+        self._parent.clicks += 1
+
+    def send_keys(self, *values):
+        pass
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+    def get_attribute(self, name):
+        return None
+
+
+BLANK_PAGE = "<html><head></head><body></body></html>"
+
+
+class _SwitchTo:
+    def __init__(self, driver):
+        self._driver = driver
+
+    def window(self, handle):
+        if handle not in self._driver.window_handles:
+            raise NoSuchWindowException(f"No window {handle}")
+        self._driver.current_window_handle = handle
+
+    def new_window(self, type_hint=None):
+        driver = self._driver
+        driver.opened += 1
+        handle = f"mock-window-{driver.opened}"
+        driver.window_handles.append(handle)
+        driver.pages[handle] = ("about:blank", BLANK_PAGE)
+        driver.current_window_handle = handle
+
+
+class MockDriver:
+    # Each window (tab) has its own URL and source, like a real browser
+    def __init__(self, *args, **kwargs):
+        self.current_window_handle = "mock-window"
+        self.window_handles = ["mock-window"]
+        self.pages = {"mock-window": ("about:blank", BLANK_PAGE)}
+        self.switch_to = _SwitchTo(self)
+        self.opened = 0
+        self.navigations = 0
+        self.clicks = 0
+        self.closed = False
+
+    @property
+    def current_url(self):
+        return self.pages[self.current_window_handle][0]
+
+    @property
+    def page_source(self):
+        return self.pages[self.current_window_handle][1]
+
+    def get(self, url):
+        if self.closed:
+            raise WebDriverException("invalid session id")
+        source = BLANK_PAGE
+        if url.startswith("http"):
+            with urllib.request.urlopen(url) as response:
+                source = response.read().decode("utf-8", "replace")
+        self.pages[self.current_window_handle] = (url, source)
+        self.navigations += 1
+
+    def find_element(self, by, selector):
+        return MockElement(self, selector)
+
+    def find_elements(self, by, selector):
+        return [MockElement(self, selector)]
+
+    def execute_script(self, script, *args):
+        if "__humanwebShot" in script:
+            return f"{self.current_url}|0|0|1280|800|{self.navigations}"
+        if "__humanwebSettle" in script:
+            return 10**9
+        if "getEntriesByType" in script:
+            return 0
+        if "readyState" in script:
+            return "complete"
+        return None
+
+    def execute(self, command, params=None):
+        # ActionChains.perform ends up here
+        return {"value": None}
+
+    def get_screenshot_as_png(self):
+        return SCREENSHOT
+
+    def delete_all_cookies(self):
+        pass
+
+    def close(self):
+        handle = self.current_window_handle
+        self.window_handles.remove(handle)
+        del self.pages[handle]
+
+    def quit(self):
+        self.closed = True
@@ -53,10 +53,115 @@ function showModal(element) {
     });
 }
 
+// Limits that keep a grab small even for large containers
+const MAX_TEXT_LENGTH = 200;
+const MAX_ATTRIBUTE_LENGTH = 200;
+const MAX_HTML_LENGTH = 2048; // 0 leaves outerHTML out entirely
+const KEY_ATTRIBUTES = [
+    'id', 'name', 'type', 'role', 'aria-label', 'placeholder', 'title', 'alt',
+    'href', 'value', 'class', 'data-testid'
+];
+
+function truncate(text, limit) {
+    return text.length > limit ? text.slice(0, limit) : text;
+}
+
+function isUnique(xpath) {
+    const result = document.evaluate(
+        xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+    );
+    return result.snapshotLength === 1;
+}
+
+function xpathLiteral(value) {
+    if (!value.includes('"')) return `"${value}"`;
+    if (!value.includes("'")) return `'${value}'`;
+    return `concat("${value.replace(/"/g, '", \'"\', "')}")`;
+}
+
+// Shortest of: unique id, unique tag+attribute, or a positional path anchored
+// at the nearest ancestor with a unique id
+function uniqueXPath(element) {
+    const tag = element.localName;
+    if (element.id && isUnique(`//*[@id=${xpathLiteral(element.id)}]`)) {
+        return `//*[@id=${xpathLiteral(element.id)}]`;
+    }
+    for (const name of ['name', 'data-testid', 'aria-label', 'placeholder']) {
+        const value = element.getAttribute(name);
+        if (value) {
+            const xpath = `//${tag}[@${name}=${xpathLiteral(value)}]`;
+            if (isUnique(xpath)) return xpath;
+        }
+    }
+    const parts = [];
+    for (let node = element; node && node.nodeType === Node.ELEMENT_NODE; node = node.parentElement) {
+        if (node !== element && node.id && isUnique(`//*[@id=${xpathLiteral(node.id)}]`)) {
+            parts.unshift(`//*[@id=${xpathLiteral(node.id)}]`);
+            return parts.join('/');
+        }
+        let index = 1;
+        let count = 0;
+        for (const sibling of node.parentNode ? node.parentNode.children : []) {
+            if (sibling.localName === node.localName) {
+                count++;
+                if (sibling === node) index = count;
+            }
+        }
+        parts.unshift(count > 1 ? `${node.localName}[${index}]` : node.localName);
+    }
+    return '/' + parts.join('/');
+}
+
+function cssSelector(element) {
+    const parts = [];
+    for (let node = element; node && node.nodeType === Node.ELEMENT_NODE; node = node.parentElement) {
+        if (node.id && document.querySelectorAll(`#${CSS.escape(node.id)}`).length === 1) {
+            parts.unshift(`#${CSS.escape(node.id)}`);
+            break;
+        }
+        let part = node.localName;
+        const sameTag = node.parentElement
+            ? Array.from(node.parentElement.children).filter(s => s.localName === node.localName)
+            : [];
+        if (sameTag.length > 1) part += `:nth-of-type(${sameTag.indexOf(node) + 1})`;
+        parts.unshift(part);
+    }
+    return parts.join(' > ');
+}
+
+// Everything a script needs to act on the element, without the subtree
+function describeElement(element) {
+    const attributes = {};
+    for (const name of KEY_ATTRIBUTES) {
+        const value = element.getAttribute(name);
+        if (value !== null) attributes[name] = truncate(value, MAX_ATTRIBUTE_LENGTH);
+    }
+    const rect = element.getBoundingClientRect();
+    const html = element.outerHTML;
+    return {
+        xpath: uniqueXPath(element),
+        css: cssSelector(element),
+        tag: element.localName,
+        attributes: attributes,
+        bbox: {
+            x: Math.round(rect.left + window.scrollX),
+            y: Math.round(rect.top + window.scrollY),
+            width: Math.round(rect.width),
+            height: Math.round(rect.height)
+        },
+        text: truncate((element.innerText || element.textContent || '').replace(/\s+/g, ' ').trim(), MAX_TEXT_LENGTH),
+        html_length: html.length,
+        html: MAX_HTML_LENGTH ? truncate(html, MAX_HTML_LENGTH) : null
+    };
+}
+
 // Function to send selected element to browser service
-function sendSelectedElement(elementHtml, elementName) {
+function sendSelectedElement(element, elementName) {
     const serviceUrl = 'http://localhost:8676/v1/connectors/browser/update_selected_element/';
-    
+    const descriptor = describeElement(element);
+    const elementHtml = descriptor.html;
+    delete descriptor.html;
+
     fetch(serviceUrl, {
         method: 'POST',
         headers: {
@@ -64,12 +169,14 @@ function sendSelectedElement(elementHtml, elementName) {
         },
         body: JSON.stringify({
             element_html: elementHtml,
-            element_name: elementName
+            element_name: elementName,
+            descriptor: descriptor
         }),
     })
     .then(response => response.json())
     .then(data => console.log('Success:', data))
     .catch((error) => console.error('Error:', error));
+    return descriptor;
 }
 
 // Variables to store the last click position
@@ -90,8 +197,8 @@ browser.runtime.onMessage.addListener((message) => {
         if (clickedElement) {
             showModal(clickedElement)
                 .then(elementName => {
-                    sendSelectedElement(clickedElement.outerHTML, elementName);
-                    console.log(`Selected element "${elementName}":`, clickedElement.outerHTML);
+                    const descriptor = sendSelectedElement(clickedElement, elementName);
+                    console.log(`Selected element "${elementName}":`, descriptor);
                 })
                 .catch(error => console.log('Element selection cancelled:', error));
         }
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The service modules import each other as siblings, like when run from there;
+# benchmarks holds the mock driver
+HERE = os.path.dirname(__file__)
+for directory in ("Library", "benchmarks"):
+    sys.path.insert(0, os.path.abspath(os.path.join(HERE, "..", directory)))
@@ -0,0 +1,102 @@
+import json
+from types import SimpleNamespace
+
+import cdp
+import pytest
+
+
+class FakeSocket:
+    """A page target that answers each call with what its handler returns."""
+
+    def __init__(self, handlers=None):
+        self.handlers = handlers or {}
+        self.incoming = []
+        self.sent = []
+
+    def send(self, text):
+        request = json.loads(text)
+        self.sent.append(request["method"])
+        handler = self.handlers.get(request["method"], lambda reply: [reply({})])
+        self.incoming += handler(lambda result: {"id": request["id"], "result": result})
+
+    def recv(self):
+        if not self.incoming:
+            raise TimeoutError("nothing more would arrive")
+        return json.dumps(self.incoming.pop(0))
+
+    def close(self):
+        pass
+
+
+def lifecycle(name, loader):
+    params = {"name": name, "frameId": "F", "loaderId": loader}
+    return {"method": "Page.lifecycleEvent", "params": params}
+
+
+@pytest.fixture
+def connect(monkeypatch):
+    def connect(socket):
+        monkeypatch.setattr(
+            cdp,
+            "websocket",
+            SimpleNamespace(create_connection=lambda *args, **kwargs: socket),
+        )
+        return cdp.CDPSession("ws://page")
+
+    return connect
+
+
+def test_navigate_ignores_load_events_of_earlier_documents(connect):
+    socket = FakeSocket()
+    session = connect(socket)
+    session.navigate("http://a", until=None)
+
+    # A click's navigation finished while nobody was reading the socket
+    socket.incoming += [lifecycle("load", "L1"), lifecycle("DOMContentLoaded", "L1")]
+    socket.handlers["Page.navigate"] = lambda reply: [
+        reply({"frameId": "F", "loaderId": "L2"}),
+        lifecycle("DOMContentLoaded", "L2"),
+        lifecycle("load", "L2"),
+        {"method": "Page.frameStoppedLoading", "params": {"frameId": "F"}},
+    ]
+    session.navigate("http://b")
+    assert [m["method"] for m in socket.incoming] == ["Page.frameStoppedLoading"]
+
+
+def test_load_event_before_the_result_counts(connect):
+    socket = FakeSocket(
+        {
+            "Page.navigate": lambda reply: [
+                lifecycle("load", "L2"),
+                reply({"frameId": "F", "loaderId": "L2"}),
+            ]
+        }
+    )
+    connect(socket).navigate("http://b")
+    assert socket.incoming == []
+
+
+def test_same_document_and_failed_navigations_do_not_wait(connect):
+    socket = FakeSocket({"Page.navigate": lambda reply: [reply({"frameId": "F"})]})
+    session = connect(socket)
+    session.navigate("http://a#section")
+
+    socket.handlers["Page.navigate"] = lambda reply: [
+        reply({"frameId": "F", "loaderId": "L3", "errorText": "net::ERR_FAILED"})
+    ]
+    with pytest.raises(cdp.CDPNavigationError, match="ERR_FAILED"):
+        session.navigate("http://nowhere")
+
+
+def test_network_is_only_enabled_while_blocking(connect):
+    socket = FakeSocket()
+    session = connect(socket)
+    session.block_urls([])
+    assert "Network.enable" not in socket.sent
+    session.block_urls(["*.png"])
+    session.block_urls([])
+    assert socket.sent[-3:] == [
+        "Network.setBlockedURLs",
+        "Network.disable",
+        "Emulation.setEmulatedMedia",
+    ]
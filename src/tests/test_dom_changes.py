@@ -0,0 +1,79 @@
+import pytest
+from dom_changes import coalesce, parse_cursor, read_changes
+from fastapi import HTTPException
+
+
+class FakeBrowser:
+    """Answers CHANGES_SCRIPT from a fixed page-side log."""
+
+    def __init__(self, doc="d", seq=0, oldest=1):
+        self.doc = doc
+        self.seq = seq
+        self.oldest = oldest
+
+    def execute_script(self, script, after, limit):
+        changes = [
+            {"seq": seq, "type": "added", "path": f"/p[{seq}]", "tag": "p"}
+            for seq in range(max(after, self.oldest - 1) + 1, self.seq + 1)
+        ]
+        return {
+            "doc": self.doc,
+            "seq": self.seq,
+            "oldest": self.oldest,
+            "truncated": len(changes) > limit,
+            "changes": changes[:limit],
+        }
+
+
+def test_parse_cursor():
+    assert parse_cursor(None) == (None, 0)
+    assert parse_cursor("abc:12") == ("abc", 12)
+    with pytest.raises(HTTPException) as e:
+        parse_cursor("abc:twelve")
+    assert e.value.status_code == 400
+
+
+def test_coalesce_keeps_only_the_latest_attribute_and_text_values():
+    changes = [
+        {"type": "attribute", "path": "/a", "name": "class", "value": "1"},
+        {"type": "added", "path": "/a", "tag": "b"},
+        {"type": "attribute", "path": "/a", "name": "title", "value": "t"},
+        {"type": "text", "path": "/a", "text": "old"},
+        {"type": "attribute", "path": "/a", "name": "class", "value": "2"},
+        {"type": "added", "path": "/a", "tag": "b"},
+        {"type": "text", "path": "/a", "text": "new"},
+    ]
+    assert coalesce(changes) == [changes[i] for i in (1, 2, 4, 5, 6)]
+
+
+def test_first_read_and_new_document_reset():
+    browser = FakeBrowser(seq=5)
+    assert read_changes(browser, None) == {
+        "cursor": "d:5",
+        "reset": True,
+        "changes": [],
+    }
+    browser.doc = "e"
+    assert read_changes(browser, "d:5")["reset"]
+
+
+def test_entries_dropped_from_the_page_log_reset():
+    browser = FakeBrowser(seq=50, oldest=20)
+    assert read_changes(browser, "d:10")["reset"]
+    assert not read_changes(browser, "d:19")["reset"]
+
+
+def test_truncated_reads_resume_after_the_last_returned_change():
+    browser = FakeBrowser(seq=5)
+    first = read_changes(browser, "d:0", limit=2)
+    assert first["truncated"]
+    assert first["cursor"] == "d:2"
+    assert [c["path"] for c in first["changes"]] == ["/p[1]", "/p[2]"]
+
+    rest = read_changes(browser, first["cursor"], limit=10)
+    assert not rest["truncated"]
+    assert rest["cursor"] == "d:5"
+    assert [c["path"] for c in rest["changes"]] == ["/p[3]", "/p[4]", "/p[5]"]
+    assert "seq" not in rest["changes"][0]
+
+    assert read_changes(browser, "d:0", limit=0)["cursor"] == "d:0"
@@ -0,0 +1,128 @@
+import pytest
+from dsl_parser import (
+    DSLSyntaxError,
+    Template,
+    compile_script,
+    compile_steps,
+    tokenize,
+)
+
+
+def test_tokenize_splits_on_whitespace_and_decodes_quoted_arguments():
+    assert tokenize('TYPE_XPATH //input "say \\"hi\\"\\n"') == [
+        "TYPE_XPATH",
+        "//input",
+        'say "hi"\n',
+    ]
+    assert tokenize('CLICK_XPATH "//a[@title=\'x y\']"') == [
+        "CLICK_XPATH",
+        "//a[@title='x y']",
+    ]
+
+
+def test_tokenize_rejects_unterminated_quotes():
+    with pytest.raises(ValueError, match="bad quoted argument"):
+        tokenize('NAVIGATE "https://example.com')
+
+
+def test_compile_script_checks_arity():
+    with pytest.raises(DSLSyntaxError) as e:
+        compile_script("NAVIGATE https://a.example https://b.example")
+    assert e.value.errors == [(0, "NAVIGATE expects 1 argument(s) (URL), got 2")]
+
+
+def test_compile_script_reports_every_bad_line():
+    script = "NAVIGATE https://example.com\nFLY away\n\nCLICK_XPATH"
+    with pytest.raises(DSLSyntaxError) as e:
+        compile_script(script)
+    assert [line for line, _ in e.value.errors] == [1, 3]
+    assert "unknown command: FLY" in str(e.value)
+
+
+def test_greedy_command_keeps_the_rest_of_the_line():
+    program = compile_script("ASK_USER Log in, then continue")
+    assert program.commands[0].raw_args() == ["Log in, then continue"]
+
+
+def test_save_to_variable_forms():
+    program = compile_script(
+        "SAVE_TO_VARIABLE greeting hello there\n"
+        "SAVE_TO_VARIABLE title READ_XPATH //h1\n"
+        "SAVE_TO_VARIABLE reply GENERATE_COMMENT $title and $greeting"
+    )
+    assert [command.raw_args() for command in program.commands] == [
+        ["greeting", "hello there"],
+        ["title", "READ_XPATH", "//h1"],
+        ["reply", "GENERATE_COMMENT", "$title and $greeting"],
+    ]
+    assert program.variables == ("greeting", "reply", "title")
+
+
+def test_save_to_variable_rejects_bad_names_and_arity():
+    with pytest.raises(DSLSyntaxError) as e:
+        compile_script("SAVE_TO_VARIABLE 1st value\nSAVE_TO_VARIABLE x READ_XPATH")
+    assert e.value.errors == [
+        (0, "invalid variable name: 1st"),
+        (1, "READ_XPATH expects 1 argument"),
+    ]
+
+
+def test_variables_must_be_set_before_use():
+    with pytest.raises(DSLSyntaxError) as e:
+        compile_script("NAVIGATE $site\nSAVE_TO_VARIABLE site https://example.com")
+    assert e.value.errors == [
+        (0, "variable $site is used before it is set (write $$ for a literal $)")
+    ]
+
+    program = compile_script("NAVIGATE $site", ("site",))
+    assert program.commands[0].args[0].refs == ("site",)
+
+    program = compile_script(
+        "FIND_AND_SAVE https://example.com price cost\nTYPE_XPATH //input $cost"
+    )
+    assert program.variables == ("cost",)
+
+
+def test_template_renders_each_reference_whole():
+    # $a must not be substituted inside $ab
+    template = Template.parse("$ab-$a/$missing")
+    assert template.refs == ("ab", "a", "missing")
+    assert template.render({"a": 1, "ab": "two"}) == "two-1/$missing"
+    assert Template.parse("plain").render({"plain": "x"}) == "plain"
+
+
+def test_double_dollar_is_a_literal_dollar():
+    program = compile_script(
+        'TYPE_XPATH //input "price $$USD, $$$$ or $$$cost"', ("cost",)
+    )
+    price = program.commands[0].args[1]
+    assert price.refs == ("cost",)
+    assert price.render({"cost": 5}) == "price $USD, $$ or $5"
+
+
+def test_commands_print_as_lines_that_parse_back():
+    program = compile_script(
+        'FIND_AND_SAVE http://x "search box" v\n'
+        'TYPE_XPATH "//a[@title=\'x\']" "say \\"hi\\" $$v"\n'
+        'SAVE_TO_VARIABLE note "" \n'
+        "ASK_USER done?"
+    )
+    lines = [command.to_line() for command in program.commands]
+    assert lines[0] == 'FIND_AND_SAVE http://x "search box" v'
+    assert compile_script("\n".join(lines)) == program
+
+
+def test_compile_steps_uses_the_script_grammar():
+    program = compile_script(
+        'NAVIGATE https://example.com\nTYPE_XPATH //input "two words"\n'
+        "SAVE_TO_VARIABLE note READ_XPATH //p\nASK_USER check $note"
+    )
+    steps = [(step["command"], step["args"]) for step in program.as_steps()]
+    assert compile_steps(steps) == program
+
+    with pytest.raises(DSLSyntaxError) as e:
+        compile_steps([("click_xpath", []), ("NAVIGATE", ["$nowhere"])])
+    assert e.value.errors == [
+        (0, "CLICK_XPATH expects 1 argument(s) (XPath), got 0"),
+        (1, "variable $nowhere is used before it is set (write $$ for a literal $)"),
+    ]
@@ -0,0 +1,31 @@
+import asyncio
+
+from events import ALL_UIDS, EventBus
+
+
+def replayed(bus, uid):
+    # What a client resuming from before the first event gets
+    async def subscribe():
+        queue = bus.subscribe(uid, last_event_id=-1)
+        return [queue.get_nowait()["id"] for _ in range(queue.qsize())]
+
+    return asyncio.run(subscribe())
+
+
+def test_history_is_kept_for_the_most_recently_active_uids():
+    bus = EventBus(history=2, max_sessions=2)
+    bus.publish("a", "navigation", {})
+    bus.publish("b", "navigation", {})
+    bus.publish("a", "navigation", {})
+    bus.publish("ghost", "error", {"detail": "No browser session"})
+    assert bus.stats()["sessions"] == 2
+    assert replayed(bus, "b") == []
+    assert replayed(bus, "a") == [1, 3]
+    assert replayed(bus, ALL_UIDS) == [1, 3, 4]
+
+
+def test_history_per_uid_is_bounded():
+    bus = EventBus(history=3)
+    for _ in range(10):
+        bus.publish("a", "navigation", {})
+    assert replayed(bus, "a") == [8, 9, 10]
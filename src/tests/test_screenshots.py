@@ -0,0 +1,26 @@
+import pytest
+from fastapi import HTTPException
+from screenshots import ScreenshotCache, parse_clip
+
+
+def test_parse_clip():
+    assert parse_clip(None) is None
+    assert parse_clip("1,2.5,30,40") == (1, 2, 30, 40)
+    for clip in ("0,0,inf,5", "0,0,nan,5", "1,2,3", "0,0,0,5"):
+        with pytest.raises(HTTPException) as e:
+            parse_clip(clip)
+        assert e.value.status_code == 400
+
+
+def test_frames_taken_before_an_invalidation_are_not_stored():
+    cache = ScreenshotCache()
+    before = cache.generation
+    cache.put("u", "state", b"old", before)
+    assert cache.get("u", "state", max_age_ms=5000) == b"old"
+
+    # The action ran while the earlier frame was still being encoded
+    cache.invalidate("u")
+    cache.put("u", "state", b"stale", before)
+    assert cache.get("u", "state", max_age_ms=5000) is None
+    cache.put("u", "state", b"new", cache.generation)
+    assert cache.get("u", "state", max_age_ms=5000) == b"new"
@@ -0,0 +1,62 @@
+import pytest
+from selection_store import SelectionStore, element_size
+
+
+def element(name, text="x"):
+    return {"name": name, "text": text}
+
+
+def test_evicts_least_recently_used_items():
+    store = SelectionStore(max_items=2)
+    store.add("u", element("a"))
+    store.add("u", element("b"))
+    store.get("u", "a")  # a is now the most recent
+    store.add("u", element("c"))
+    assert [e["name"] for e in store.all("u")] == ["a", "c"]
+    assert store.get("u", "b") is None
+    assert store.stats()["evictions"] == 1
+
+
+def test_evicts_by_bytes_but_keeps_the_newest_element():
+    store = SelectionStore(max_bytes=2 * element_size(element("a", "x" * 10)))
+    store.add("u", element("a", "x" * 10))
+    store.add("u", element("b", "x" * 10))
+    store.add("u", element("c", "x" * 10))
+    assert [e["name"] for e in store.all("u")] == ["b", "c"]
+
+    store.add("u", element("big", "x" * 1000))
+    assert [e["name"] for e in store.all("u")] == ["big"]
+    assert store.last("u")["name"] == "big"
+    assert store.stats()["bytes"] == element_size(element("big", "x" * 1000))
+
+
+def test_replacing_a_name_and_unnamed_grabs():
+    store = SelectionStore()
+    store.add("u", element("a", "old"))
+    store.add("u", {"text": "unnamed"})
+    store.add("u", element("a", "new"))
+    assert store.get("u", "a")["text"] == "new"
+    assert [e["text"] for e in store.all("u")] == ["unnamed", "new"]
+    assert store.all("other") == []
+    store.clear("u")
+    assert store.last("u") is None
+    assert store.stats()["elements"] == 0
+
+
+@pytest.mark.parametrize("filename", ["selections.db", "selections.json"])
+def test_reloads_from_disk(tmp_path, filename):
+    path = str(tmp_path / filename)
+    store = SelectionStore(max_items=2, path=path)
+    store.add("u", element("a"))
+    store.add("u", {"text": "unnamed"})
+    store.add("u", element("b"))  # evicts a
+    store.add("v", element("c"))
+    store.clear("v")
+
+    reloaded = SelectionStore(max_items=3, path=path)
+    assert [e.get("name") for e in reloaded.all("u")] == [None, "b"]
+    assert reloaded.last("u")["name"] == "b"
+    assert reloaded.all("v") == []
+    # Unnamed keys keep counting from where the last run stopped
+    reloaded.add("u", {"text": "another"})
+    assert [e["text"] for e in reloaded.all("u")] == ["unnamed", "x", "another"]
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+
+from session_executor import SessionExecutors
+
+
+def test_uids_without_a_browser_leave_no_executor():
+    browsers = {}
+    executors = SessionExecutors(keep=browsers.__contains__)
+
+    async def main():
+        for index in range(5):
+            await executors.run(f"ghost{index}", lambda: None)
+        await executors.run("u", browsers.__setitem__, "u", object())
+        assert len(executors) == 1
+        await executors.run("u", browsers.pop, "u")
+
+    asyncio.run(main())
+    assert len(executors) == 0
+
+
+def test_calls_queued_behind_a_release_stay_on_one_thread():
+    browsers = {"u": object()}
+    executors = SessionExecutors(keep=browsers.__contains__)
+    running = []
+    overlaps = []
+
+    def work(release=False):
+        running.append(threading.get_ident())
+        if len(running) > 1:
+            overlaps.append(list(running))
+        time.sleep(0.01)
+        if release:
+            browsers.pop("u", None)
+        running.remove(threading.get_ident())
+
+    async def main():
+        calls = [executors.run("u", work, release=True)]
+        calls += [executors.run("u", work) for _ in range(5)]
+        await asyncio.gather(*calls)
+
+    asyncio.run(main())
+    assert overlaps == []
+    assert len(executors) == 0
+
+
+def test_a_cancelled_request_keeps_the_executor_until_its_call_ends():
+    executors = SessionExecutors(keep=lambda uid: False)
+    started = threading.Event()
+    finish = threading.Event()
+
+    def slow():
+        started.set()
+        finish.wait(5)
+
+    async def main():
+        task = asyncio.ensure_future(executors.run("u", slow))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        task.cancel()
+        await asyncio.sleep(0.01)
+        # Still running on the thread: a new call must queue behind it
+        assert len(executors) == 1
+        finish.set()
+        await executors.run("u", lambda: None)
+
+    asyncio.run(main())
+    assert len(executors) == 0
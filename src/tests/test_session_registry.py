@@ -0,0 +1,105 @@
+import pytest
+import session_registry
+from session_registry import NoWorkerAvailable, SessionRegistry
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+
+    def tick():
+        now[0] += 0.001
+        return now[0]
+
+    monkeypatch.setattr(session_registry.time, "time", tick)
+    return now
+
+
+@pytest.fixture
+def registry(tmp_path, clock):
+    return SessionRegistry(str(tmp_path / "registry.db"), ttl=15.0)
+
+
+def test_places_on_the_least_loaded_worker(registry):
+    registry.heartbeat("http://a", sessions=0, capacity=4)
+    registry.heartbeat("http://b", sessions=1, capacity=4)
+    assert registry.place("u1") == "http://a"
+    # Placements count as load before the next heartbeat reports them
+    assert registry.place("u2") == "http://a"
+    assert registry.place("u3") in ("http://a", "http://b")
+    assert registry.place("u1") == "http://a"
+    assert registry.owner("u1") == "http://a"
+    assert registry.owner("unplaced") is None
+
+
+def test_full_workers_raise(registry):
+    registry.heartbeat("http://a", sessions=0, capacity=1)
+    registry.place("u1")
+    with pytest.raises(NoWorkerAvailable):
+        registry.place("u2")
+    registry.release("u1")
+    assert registry.place("u2") == "http://a"
+
+
+def test_no_workers_raise(registry):
+    with pytest.raises(NoWorkerAvailable):
+        registry.place("u1")
+
+
+def test_failover_away_from_an_excluded_worker(registry):
+    registry.heartbeat("http://a", sessions=0, capacity=4)
+    registry.heartbeat("http://b", sessions=3, capacity=4)
+    assert registry.place("u1") == "http://a"
+    assert registry.place("u1", exclude="http://a") == "http://b"
+    assert registry.owner("u1") == "http://b"
+    assert registry.failovers == 1
+    registry.heartbeat("http://b", sessions=4, capacity=4)
+    with pytest.raises(NoWorkerAvailable):
+        registry.place("u2", exclude="http://a")
+
+
+def test_uids_move_when_their_worker_stops_heartbeating(registry, clock):
+    registry.heartbeat("http://a", sessions=0, capacity=4)
+    registry.heartbeat("http://b", sessions=2, capacity=4)
+    assert registry.place("u1") == "http://a"
+    clock[0] += 10
+    registry.heartbeat("http://b", sessions=2, capacity=4)
+    clock[0] += 10
+    assert [w["url"] for w in registry.live_workers()] == ["http://b"]
+    assert registry.owner("u1") is None
+    assert registry.place("u1") == "http://b"
+    assert registry.failovers == 1
+
+
+def test_deregister_drops_placements(registry):
+    registry.heartbeat("http://a", sessions=0, capacity=4)
+    registry.place("u1")
+    registry.deregister("http://a")
+    assert registry.owner("u1") is None
+    assert registry.stats()["placements"] == 0
+
+
+def test_load_comes_from_the_heartbeat(registry):
+    registry.heartbeat("http://a", sessions=0, capacity=2)
+    registry.place("u1")
+    registry.place("u2")
+    with pytest.raises(NoWorkerAvailable):
+        registry.place("u3")
+    # Both uids came and went without a release; the worker reports none
+    registry.heartbeat("http://a", sessions=0, capacity=2)
+    assert registry.place("u3") == "http://a"
+
+
+def test_heartbeats_expire_placements_the_worker_no_longer_holds(registry, clock):
+    registry.heartbeat("http://a", sessions=0, capacity=3)
+    registry.place("gone")
+    registry.place("kept")
+    clock[0] += 20
+    registry.heartbeat("http://a", sessions=2, capacity=3, uids=["gone", "kept"])
+    registry.place("starting")
+    registry.heartbeat("http://a", sessions=1, capacity=3, uids=["kept"])
+    assert registry.owner("gone") is None
+    assert registry.owner("kept") == "http://a"
+    # Too young to tell from a uid whose first request never got a browser
+    assert registry.owner("starting") == "http://a"
+    assert registry.stats()["placements"] == 2
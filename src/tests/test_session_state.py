@@ -0,0 +1,54 @@
+import time
+
+import session_state
+from selenium.common.exceptions import InvalidCookieDomainException
+
+
+class FakeBrowser:
+    def __init__(self, cookies=(), reject=()):
+        self.current_url = "https://example.com/inbox"
+        self.cookies = list(cookies)
+        self.reject = set(reject)
+        self.added = []
+        self.scripts = []
+
+    def get(self, url):
+        self.current_url = url
+
+    def get_cookies(self):
+        return self.cookies
+
+    def add_cookie(self, cookie):
+        if cookie["name"] in self.reject:
+            raise InvalidCookieDomainException("rejected")
+        self.added.append(cookie)
+
+    def execute_script(self, script, *args):
+        self.scripts.append(args)
+        return {"local": {"k": "v"}, "session": {}}
+
+
+def test_capture_keeps_same_site():
+    cookie = {"name": "sid", "value": "1", "sameSite": "None", "secure": True}
+    origin, state = session_state.capture(FakeBrowser([dict(cookie, extra=1)]))
+    assert origin == "https://example.com"
+    assert state["cookies"] == [cookie]
+    assert state["local"] == {"k": "v"}
+
+
+def test_restore_skips_expired_and_rejected_cookies():
+    state = {
+        "cookies": [
+            {"name": "old", "value": "1", "expiry": int(time.time()) - 10},
+            {"name": "bad", "value": "2"},
+            {"name": "sid", "value": "3", "expiry": int(time.time()) + 3600},
+            {"name": "pref", "value": "4", "sameSite": "None"},
+        ],
+        "local": {"k": "v"},
+        "session": {},
+    }
+    browser = FakeBrowser(reject={"bad"})
+    session_state.restore(browser, "https://example.com", state)
+    assert [cookie["name"] for cookie in browser.added] == ["sid", "pref"]
+    # Web storage is put back even though a cookie was rejected
+    assert browser.scripts == [(state,)]
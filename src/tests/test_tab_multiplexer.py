@@ -0,0 +1,156 @@
+import threading
+import time
+
+import pytest
+from mock_driver import MockDriver
+from selenium.common.exceptions import WebDriverException
+from tab_multiplexer import TabMultiplexer
+
+
+class Drivers:
+    """acquire/release/discard for a multiplexer, with what happened to each."""
+
+    def __init__(self, factory=MockDriver):
+        self.factory = factory
+        self.released = []
+        self.discarded = []
+
+    def acquire(self):
+        return self.factory()
+
+    def release(self, driver, recycle=True):
+        self.released.append(driver)
+
+    def discard(self, driver):
+        self.discarded.append(driver)
+
+    def multiplexer(self, tabs_per_browser=2):
+        return TabMultiplexer(
+            self.acquire, self.release, self.discard, tabs_per_browser
+        )
+
+
+def is_free(lock):
+    # Locks are re-entrant, so ask from a thread that holds none
+    result = []
+
+    def probe():
+        acquired = lock.acquire(timeout=1)
+        if acquired:
+            lock.release()
+        result.append(acquired)
+
+    thread = threading.Thread(target=probe)
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def open_in_guard(tabs, uid):
+    # What a uid's first navigate does on its executor thread
+    with tabs.guard(uid):
+        driver = tabs.open(uid)
+        driver.get(f"about:{uid}")
+    return driver
+
+
+def test_uids_sharing_a_driver_never_interleave():
+    tabs = Drivers().multiplexer()
+    drivers = {}
+    busy = {}
+    overlaps = []
+    seen = []
+
+    def session(uid):
+        for step in range(20):
+            with tabs.guard(uid):
+                if uid not in drivers:
+                    drivers[uid] = tabs.open(uid)
+                driver = drivers[uid]
+                if busy.setdefault(id(driver), uid) != uid:
+                    overlaps.append(uid)
+                driver.get(f"about:{uid}/{step}")
+                time.sleep(0.001)
+                seen.append((uid, driver.current_url))
+                busy.pop(id(driver), None)
+
+    threads = [threading.Thread(target=session, args=(uid,)) for uid in "ab"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert drivers["a"] is drivers["b"]
+    assert overlaps == []
+    assert len(seen) == 40
+    assert all(url.startswith(f"about:{uid}/") for uid, url in seen)
+
+
+def test_a_new_tab_is_used_by_the_call_that_opened_it():
+    tabs = Drivers().multiplexer()
+    first = open_in_guard(tabs, "a")
+    second = open_in_guard(tabs, "b")
+    assert first is second
+    assert len(first.window_handles) == 2
+    with tabs.guard("a"):
+        assert first.current_url == "about:a"
+    with tabs.guard("b"):
+        assert first.current_url == "about:b"
+    assert is_free(tabs._owners["a"].lock)
+
+
+def test_moving_a_uid_to_its_own_driver_releases_the_shared_one():
+    drivers = Drivers()
+    tabs = drivers.multiplexer()
+    shared = open_in_guard(tabs, "a")
+    open_in_guard(tabs, "b")
+    host = tabs._owners["a"]
+    with tabs.guard("a"):
+        # open_url moving the uid to a process of its own
+        tabs.close("a")
+        own = drivers.acquire()
+        own.get("about:a")
+    assert is_free(host.lock)
+    assert "a" not in tabs
+    assert shared.window_handles == [tabs._owners["b"].tabs["b"]]
+    with tabs.guard("b"):
+        assert shared.current_url == "about:b"
+
+
+def test_invalid_session_recovery_releases_every_lock():
+    drivers = Drivers()
+    tabs = drivers.multiplexer()
+    broken = open_in_guard(tabs, "a")
+    old = tabs._owners["a"]
+    with tabs.guard("a"):
+        # open_url after "invalid session id": drop the tab, open a fresh one
+        tabs.close("a", broken=True)
+        fresh = tabs.open("a")
+        fresh.get("about:a")
+    new = tabs._owners["a"]
+    assert fresh is not broken
+    assert drivers.discarded == [broken]
+    assert is_free(old.lock)
+    assert is_free(new.lock)
+    with tabs.guard("a"):
+        assert fresh.current_url == "about:a"
+
+
+def test_a_failed_tab_open_releases_the_driver():
+    class NoTabs(MockDriver):
+        def __init__(self):
+            super().__init__()
+            self.switch_to.new_window = self.fail
+
+        def fail(self, type_hint=None):
+            raise WebDriverException("invalid session id")
+
+    drivers = Drivers(NoTabs)
+    tabs = drivers.multiplexer()
+    open_in_guard(tabs, "a")
+    host = tabs._owners["a"]
+    with pytest.raises(WebDriverException):
+        with tabs.guard("b"):
+            tabs.open("b")
+    assert "b" not in tabs
+    assert host.broken
+    assert is_free(host.lock)